@@ -1,51 +1,46 @@
-
 import streamlit as st
-from datetime import datetime
-from io import BytesIO
-from pathlib import Path
-import base64
+import bisect
+import html
+import logging
+import os
+from concurrent.futures import wait
+from datetime import date
+
+from prebate import cache, components, mail, printable, render, report, tenants, tokens
+from prebate.state import AnswerState
+
+log = logging.getLogger(__name__)
+
+# st.fragment reruns only the decorated function; older Streamlit calls it experimental_fragment
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+def request_headers():
+    try:
+        from streamlit.web.server.websocket_headers import _get_websocket_headers
+        return _get_websocket_headers() or {}
+    except Exception:
+        return {}
+
+# ?r=<token> reopens a finished report on any replica without server-side state
+SHARED, BAD_TOKEN = None, False
+if st.query_params.get("r"):
+    try:
+        TENANT, SHARED = tokens.read(st.query_params["r"])
+    except tokens.TokenError:
+        BAD_TOKEN = True
+if SHARED is None:
+    TENANT = tenants.resolve(st.query_params, request_headers())
+QN = TENANT.questionnaire
+if mail.enabled():
+    mail.start()  # in-process email workers (prebate.mail), so queued emails go out after a restart
 
 st.set_page_config(
-    page_title="PreBate – Estate Readiness",
+    page_title=TENANT.page_title,
     page_icon="🧾",
     layout="centered",
     initial_sidebar_state="collapsed",
 )
 
-def first_existing(paths):
-    for p in paths:
-        try:
-            if p.exists():
-                return p
-        except Exception:
-            continue
-    return None
-
-APP_DIR = Path(__file__).parent.resolve()
-CANDIDATES = [
-    APP_DIR / "assets" / "prebate_logo.png",
-    Path.cwd() / "assets" / "prebate_logo.png",
-    APP_DIR.parent / "assets" / "prebate_logo.png",
-    Path("/mount/src/prebate-pilot/assets/prebate_logo.png"),
-]
-LOGO_PATH = first_existing(CANDIDATES)
-
-def logo_html_base64(path: Path) -> str:
-    try:
-        b64 = base64.b64encode(path.read_bytes()).decode("ascii")
-        return f"""
-        <div class="logo-wrap">
-          <img class="logo" alt="PreBate" src="data:image/png;base64,{b64}" />
-        </div>
-        """
-    except Exception:
-        return """
-        <div class="logo-fallback">
-          <div class="brand">PreBate</div>
-          <div class="tag">Estate Readiness</div>
-        </div>
-        """
-
 st.markdown("""
 <style>
   .block-container { padding-top: 1rem; padding-bottom: 2rem; }
@@ -57,19 +52,6 @@ st.markdown("""
   .hero { text-align:center; }
   .hero h1 { font-size: 2.0rem; margin: .25rem 0; color: #10243D; }
   .hero p { color: #111827; max-width: 780px; margin: 0 auto .75rem; font-size: 1.05rem; }
-  .pb-btn { margin-bottom: .5rem; }
-  .pb-btn button {
-      width: 100% !important;
-      height: 88px !important;
-      border-radius: 18px !important;
-      font-size: 28px !important;
-      font-weight: 700 !important;
-      box-shadow: 0 8px 18px rgba(0,0,0,0.06) !important;
-      border: none !important;
-  }
-  .pb-btn.yes button   { background: #16A34A !important; color: #FFFFFF !important; }
-  .pb-btn.no  button   { background: #DC2626 !important; color: #FFFFFF !important; }
-  .pb-btn.maybe button { background: #F59E0B !important; color: #111827 !important; }
   .question-text { font-size: 1.35rem; font-weight: 700; color: #0f172a; margin: .25rem 0 1rem; }
   .pill { display:inline-block; padding: .35rem .75rem; border-radius:999px; font-weight:700; color:#fff; }
   .pill-low { background:#16A34A; }
@@ -77,55 +59,24 @@ st.markdown("""
   .pill-high { background:#DC2626; }
   @media (max-width: 600px) {
     .hero h1 { font-size: 1.6rem; }
-    .pb-btn button { height: 80px !important; font-size: 24px !important; }
   }
 </style>
 """, unsafe_allow_html=True)
 
-if LOGO_PATH is not None and LOGO_PATH.exists():
-    st.markdown(logo_html_base64(LOGO_PATH), unsafe_allow_html=True)
-else:
-    st.markdown(logo_html_base64(Path()), unsafe_allow_html=True)
+st.markdown(TENANT.logo_html, unsafe_allow_html=True)
+if BAD_TOKEN:
+    st.warning("That report link is not valid any more. Please answer the questions again.")
+    del st.query_params["r"]
 
-st.markdown("""
+st.markdown(f"""
 <div class="hero">
-  <h1>PreBate – Estate Readiness</h1>
-  <p>Helping you prepare your estate with easy-to-use guidance.</p>
+  <h1>{html.escape(TENANT.hero_title)}</h1>
+  <p>{html.escape(TENANT.hero_subtitle)}</p>
   <hr/>
 </div>
 """, unsafe_allow_html=True)
 
-QUESTIONS = [
-    {"id":"q_country", "text":"Do you currently live in Ireland?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_partner", "text":"Are you married, in a civil partnership, or cohabiting?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_children", "text":"Do you have children or dependents?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_divorce", "text":"Have you ever been separated or divorced?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_property_sole", "text":"Do you own property in your sole name?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_property_coown", "text":"Do you co-own property with someone else?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_property_joint_tenants", "text":"If co-owned, is it owned as joint tenants (not tenants-in-common)?", "type":"yn", "opts":["Yes","No"], "show_if":{"q_property_coown":"Yes"}},
-    {"id":"q_property_registered", "text":"Is your property registered with the Land Registry (has a folio number)?", "type":"ynm", "opts":["Yes","Not sure","No"]},
-    {"id":"q_property_abroad", "text":"Do you own property outside Ireland?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_bank_sole", "text":"Do you hold any bank accounts in your sole name?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_caregiver_access", "text":"Does anyone other than you have access to your bank accounts or finances — even informally (family, friend, or carer)?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_caregiver_official", "text":"Is this person officially named (joint holder) or do they have an Enduring Power of Attorney?", "type":"yn", "opts":["Yes","No"], "show_if":{"q_caregiver_access":"Yes"}},
-    {"id":"q_bank_joint", "text":"Do you have joint bank accounts?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_investments", "text":"Do you hold shares, bonds, or crypto in your own name?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_multiple_brokers", "text":"Do you hold savings/investments at multiple banks or brokers?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_life", "text":"Do you have life insurance?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_life_beneficiary", "text":"Have you named a beneficiary on your life policy?", "type":"yn", "opts":["Yes","No"], "show_if":{"q_life":"Yes"}},
-    {"id":"q_pension", "text":"Do you have a private or occupational pension?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_pension_beneficiary", "text":"Have you filed a nomination of beneficiary for your pension?", "type":"yn", "opts":["Yes","No"], "show_if":{"q_pension":"Yes"}},
-    {"id":"q_death_in_service", "text":"Do you have death-in-service benefits via your employer?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_will", "text":"Do you have a valid will?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_will_recent", "text":"Was your will updated within the last 3 years?", "type":"yn", "opts":["Yes","No"], "show_if":{"q_will":"Yes"}},
-    {"id":"q_will_stored", "text":"Is your will securely stored and accessible?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_executor_informed", "text":"Does your executor know they are named in your will?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_lifetime_gifts", "text":"Have you made any lifetime gifts or set up any trusts?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_business", "text":"Do you own or co-own a business?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_farmland", "text":"Do you own farmland, forestry, or development land?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_digital", "text":"Do you have important digital assets (e.g., crypto wallets, domains, social/media accounts)?", "type":"yn", "opts":["Yes","No"]},
-    {"id":"q_expect_inherit", "text":"Do you expect to inherit significant assets yourself in the near future?", "type":"yn", "opts":["Yes","No"]},
-]
+QUESTIONS = QN.questions
 
 def cond_ok(q):
     rule = q.get("show_if")
@@ -142,156 +93,342 @@ def next_index(idx):
         idx += 1
     return idx
 
+def record(i, value):
+    # Answer question i, keep the trail of answered questions (ascending
+    # indexes) in step and move on: to the next question, or, when editing
+    # from the review list, to any follow-up question the new answer revealed
+    # and then straight back to where the user left off.
+    # In adaptive mode "next" is the most decisive open question, and the
+    # order questions were answered in (asked) is what Back walks.
+    trail, asked = st.session_state.trail, st.session_state.asked
+    cleared = st.session_state.answers.answer(i, value)
+    if cleared:
+        trail[:] = [j for j in trail if j not in cleared]
+    asked[:] = [j for j in asked if j != i and j not in cleared] + [i]
+    pos = bisect.bisect_left(trail, i)
+    if pos == len(trail) or trail[pos] != i:
+        trail.insert(pos, i)
+    resume = st.session_state.get("resume")
+    if resume is None:
+        st.session_state.step = next_adaptive() if st.session_state.get("adaptive") else next_index(i + 1)
+        return
+    codes = st.session_state.answers.codes
+    pending = [j for j in QN.children[i] if not codes[j] and QN.visible(j, codes) and j < resume]
+    if pending:
+        st.session_state.step = min(pending)
+    else:
+        st.session_state.step = st.session_state.pop("resume")
+
+def previous():
+    step = st.session_state.step
+    if st.session_state.get("adaptive"):
+        asked = st.session_state.asked
+        pos = asked.index(step) if step in asked else len(asked)
+        return asked[pos - 1] if pos else None
+    trail = st.session_state.trail
+    pos = bisect.bisect_left(trail, step)
+    return trail[pos - 1] if pos else None
+
+def back():
+    i = previous()
+    if i is not None:
+        st.session_state.step = i
+
+def next_adaptive():
+    ask = QN.outlook(st.session_state.answers.codes).next_question
+    return len(QUESTIONS) if ask is None else ask
+
+def set_adaptive():
+    # The toggle's own key is dropped while it is off screen; keep the choice in "adaptive".
+    st.session_state.adaptive = st.session_state.adaptive_toggle
+    if "resume" not in st.session_state:
+        codes = st.session_state.answers.codes
+        first = next((i for i in range(len(QUESTIONS)) if not codes[i] and QN.visible(i, codes)), len(QUESTIONS))
+        st.session_state.step = next_adaptive() if st.session_state.adaptive else first
+
+def finish():
+    st.session_state.step = len(QUESTIONS)
+    st.session_state.pop("resume", None)
+
+def jump(i):
+    st.session_state.setdefault("resume", st.session_state.step)
+    st.session_state.step = i
+    st.session_state.completed = False
+
+def resume():
+    st.session_state.step = st.session_state.pop("resume")
+
+KEY_ANSWERS = {"y": "Yes", "n": "No", "?": "Not sure"}
+BUTTONS = {"Yes": ("✅ Yes", "yes"), "Not sure": ("❓ Not sure", "maybe"), "No": ("❌ No", "no")}  # option -> (label, colour)
+
+def fresh(event, name):
+    # Components keep returning their last value on later reruns; act on each event once.
+    if not event or event.get("seq") == st.session_state.get(name):
+        return None
+    st.session_state[name] = event["seq"]
+    return event
+
+def apply_click(event):
+    if fresh(event, "click_seq") and event.get("question") == QUESTIONS[st.session_state.step]["id"]:
+        if event["value"] == "back":
+            back()
+        elif event["value"] in QUESTIONS[st.session_state.step]["opts"]:
+            record(st.session_state.step, event["value"])
+
+def apply_keys(batch):
+    # A burst of shortcuts arrives as one batch: apply them in order, in this one rerun.
+    if not fresh(batch, "keys_seq"):
+        return
+    for k in batch.get("keys", ()):
+        step = st.session_state.step
+        if step >= len(QUESTIONS):
+            break
+        if k == "back":
+            back()
+        elif KEY_ANSWERS.get(k) in QUESTIONS[step]["opts"]:
+            record(step, KEY_ANSWERS[k])
+
+def review():
+    answers = st.session_state.answers
+    with st.expander(f"Review your answers ({len(st.session_state.trail)})"):
+        for i in st.session_state.trail:
+            q = QUESTIONS[i]
+            text_col, edit_col = st.columns([5, 1])
+            text_col.markdown(f"{q['text']}  \n**{answers.get(q['id'])}**")
+            edit_col.button("Edit", key=f"edit_{q['id']}", on_click=jump, args=(i,), use_container_width=True)
+
 if "step" not in st.session_state: st.session_state.step = 0
-if "answers" not in st.session_state: st.session_state.answers = {}
+if not isinstance(st.session_state.get("answers"), AnswerState): st.session_state.answers = AnswerState(QN)
+elif st.session_state.answers.qn is not QN: st.session_state.answers = st.session_state.answers.rebind(QN)
 if "completed" not in st.session_state: st.session_state.completed = False
-st.session_state.step = next_index(st.session_state.step)
+if SHARED is not None and st.session_state.get("token") != st.query_params["r"]:
+    st.session_state.answers = SHARED; st.session_state.step = len(QUESTIONS); st.session_state.completed = True
+    st.session_state.pop("trail", None)
+    st.session_state.token = st.query_params["r"]
+if "trail" not in st.session_state or len(st.session_state.trail) != len(st.session_state.answers):
+    # new session, or answers replaced wholesale (shared link, what-if, start over, rebind)
+    st.session_state.trail = [i for i, c in enumerate(st.session_state.answers.codes) if c]
+    st.session_state.asked = list(st.session_state.trail)
+    st.session_state.pop("resume", None)
+def progress():
+    total_showable = sum(1 for q in QUESTIONS if cond_ok(q))
+    answered = len(st.session_state.trail)
+    st.progress(int((answered/total_showable)*100) if total_showable else 0,
+                text=f"{answered} of {total_showable} answered")
 
-total_showable = sum(1 for q in QUESTIONS if cond_ok(q))
-answered = sum(1 for q in QUESTIONS if cond_ok(q) and q["id"] in st.session_state.answers)
-st.progress(int((answered/total_showable)*100) if total_showable else 0,
-            text=f"{answered} of {total_showable} answered")
+def unanswered():
+    codes = st.session_state.answers.codes
+    return sum(1 for i in range(len(QUESTIONS)) if not codes[i] and QN.visible(i, codes))
 
-if st.session_state.step < len(QUESTIONS):
-    q = QUESTIONS[st.session_state.step]
+def outlook():
+    # Where the answers so far can still lead, and a way out once the rest can't matter.
+    now = QN.outlook(st.session_state.answers.codes)
+    spans = []
+    for kind, (lo, hi) in (("Probate", now.probate), ("Dispute", now.dispute)):
+        low, high = QN.label(kind.lower(), lo)[0], QN.label(kind.lower(), hi)[0]
+        spans.append(f"{kind}: {low}" if low == high else f"{kind}: {low} to {high}")
+    st.caption("Possible result so far: " + " · ".join(spans))
+    if now.labels_settled and now.actions_settled:
+        st.success("Your answers so far settle the result: the remaining questions can't change it.")
+        st.button("See my results", key="finish_btn", on_click=finish, type="primary")
+    elif now.labels_settled:
+        left = unanswered()
+        st.info(f"Your probate and dispute levels are settled. The remaining {left} question{'s' * (left != 1)} "
+                "only add to your recommended actions.")
+        st.button("Finish now", key="finish_btn", on_click=finish)
+
+@fragment
+def question_card():
+    # Answering reruns only this fragment (progress, question, buttons, review)
+    # instead of the whole script with its page config, CSS, logo and hero;
+    # the full page only reruns once the last answer leads to the results.
+    st.session_state.step = next_index(st.session_state.step)
+    apply_click(st.session_state.get("answer"))  # the button group's last click, read before it is redrawn
+    apply_keys(components.keys(key="keys"))
+    st.session_state.step = next_index(st.session_state.step)
+    if st.session_state.step >= len(QUESTIONS):
+        st.session_state.completed = True
+        st.rerun()
+    st.toggle("Most important questions first", value=st.session_state.get("adaptive", False),
+              key="adaptive_toggle", on_change=set_adaptive)
+    progress()
+    if st.session_state.get("adaptive") and "resume" not in st.session_state:
+        outlook()
+
+    step = st.session_state.step
+    q = QUESTIONS[step]
     st.markdown(f'<div class="question-text">{q["text"]}</div>', unsafe_allow_html=True)
+    if q["id"] in st.session_state.answers:
+        st.caption(f"Current answer: {st.session_state.answers[q['id']]}")
 
-    if q["type"] == "ynm":
-        c1, c2, c3 = st.columns(3, gap="small")
-        with c1:
-            st.markdown('<div class="pb-btn yes">', unsafe_allow_html=True)
-            if st.button("✅ Yes", use_container_width=True, key=f"{q['id']}_yes"):
-                st.session_state.answers[q["id"]] = "Yes"
-                st.session_state.step = next_index(st.session_state.step + 1)
-                st.rerun()
-            st.markdown('</div>', unsafe_allow_html=True)
-        with c2:
-            st.markdown('<div class="pb-btn maybe">', unsafe_allow_html=True)
-            if st.button("❓ Not sure", use_container_width=True, key=f"{q['id']}_maybe"):
-                st.session_state.answers[q["id"]] = "Not sure"
-                st.session_state.step = next_index(st.session_state.step + 1)
-                st.rerun()
-            st.markdown('</div>', unsafe_allow_html=True)
-        with c3:
-            st.markdown('<div class="pb-btn no">', unsafe_allow_html=True)
-            if st.button("❌ No", use_container_width=True, key=f"{q['id']}_no"):
-                st.session_state.answers[q["id"]] = "No"
-                st.session_state.step = next_index(st.session_state.step + 1)
-                st.rerun()
-            st.markdown('</div>', unsafe_allow_html=True)
-    else:
-        c1, c2 = st.columns(2, gap="small")
-        with c1:
-            st.markdown('<div class="pb-btn yes">', unsafe_allow_html=True)
-            if st.button("✅ Yes", use_container_width=True, key=f"{q['id']}_yes"):
-                st.session_state.answers[q["id"]] = "Yes"
-                st.session_state.step = next_index(st.session_state.step + 1)
-                st.rerun()
-            st.markdown('</div>', unsafe_allow_html=True)
-        with c2:
-            st.markdown('<div class="pb-btn no">', unsafe_allow_html=True)
-            if st.button("❌ No", use_container_width=True, key=f"{q['id']}_no"):
-                st.session_state.answers[q["id"]] = "No"
-                st.session_state.step = next_index(st.session_state.step + 1)
-                st.rerun()
-            st.markdown('</div>', unsafe_allow_html=True)
-
-    back_col, _ = st.columns([1,4])
-    with back_col:
-        if st.button("← Back", use_container_width=True, help="Go to previous question", key=f"{q['id']}_back"):
-            i = st.session_state.step - 1
-            while i >= 0 and (not cond_ok(QUESTIONS[i]) or QUESTIONS[i]["id"] not in st.session_state.answers):
-                i -= 1
-            if i >= 0:
-                st.session_state.step = i
-            st.rerun()
+    options = [(BUTTONS[o][0], o, BUTTONS[o][1]) if o in BUTTONS else (o, o, "maybe") for o in q["opts"]]
+    components.button_group(q["id"], options, back=previous() is not None, key="answer")
+    if "resume" in st.session_state:
+        label = "Back to results" if st.session_state.resume >= len(QUESTIONS) else "Continue where I left off"
+        st.button(label, key="resume_btn", on_click=resume)
+    st.caption("Keyboard: Y = Yes · N = No" + (" · ? = Not sure" if q["type"] == "ynm" else "") + " · Backspace = Back")
+    if st.session_state.trail:
+        review()
 
+st.session_state.step = next_index(st.session_state.step)
+if st.session_state.step < len(QUESTIONS):
+    question_card()
 else:
+    progress()
     st.session_state.completed = True
 
-if st.session_state.completed:
-    a = st.session_state.answers
-    probate_risk = 0; dispute_risk = 0; actions = []
-    def add(x):
-        if x not in actions: actions.append(x)
-
-    if a.get("q_country") == "No": add("Laws vary outside Ireland—ensure local estate planning aligned to your jurisdiction.")
-    if a.get("q_partner") == "No": probate_risk += 1; add("If single, ensure you have a valid will to direct assets clearly.")
-    if a.get("q_children") == "Yes": add("Add guardianship and inheritance clauses for dependents in your will.")
-    if a.get("q_divorce") == "Yes": probate_risk += 1; add("Review titles and beneficiaries after separation/divorce.")
-
-    if a.get("q_property_sole") == "Yes": probate_risk += 2; add("Consider adding a joint owner (joint tenants), using a trust, or updating your will for solely-owned property.")
-    if a.get("q_property_coown") == "Yes" and a.get("q_property_joint_tenants") == "No": probate_risk += 1; add("Consider joint tenancy where appropriate to enable survivorship.")
-    if a.get("q_property_registered") in ["No","Not sure"]: probate_risk += 1; add("Register any unregistered property with the Land Registry (get a folio number).")
-    if a.get("q_property_abroad") == "Yes": probate_risk += 1; add("Create a local will or plan for assets held outside Ireland.")
-
-    if a.get("q_bank_sole") == "Yes": probate_risk += 1; add("For sole accounts, consider joint holder or pay-on-death nomination (if available).")
-    if a.get("q_caregiver_access") == "Yes":
-        if a.get("q_caregiver_official") == "Yes":
-            dispute_risk += 1; add("Document the intent of caregiver/joint access (assistance vs inheritance) in writing with your solicitor.")
+def whatif_pick(i, key):
+    pick = st.session_state[key]
+    if pick is not None:
+        _, codes, mask = state = st.session_state.whatif
+        codes[i] = QUESTIONS[i]["opts"].index(pick) + 1
+        for j in [i] + QN.prune(codes, i):
+            mask = QN.refire(codes, mask, j)
+        state[2] = mask
+
+@fragment
+def what_if(token, actual):
+    # Runs as a fragment: changing an answer here reruns only this panel and
+    # re-tests only the rules that read that question; the report and PDF
+    # above stay as they are until the new answers are applied.
+    state = st.session_state.get("whatif")
+    if state is None or state[0] != token:
+        codes = bytearray(QN.encode(st.session_state.answers))
+        state = st.session_state.whatif = [token, codes, QN.fired(codes)]
+    _, codes, mask = state
+
+    shown = [i for i in range(len(QUESTIONS)) if QN.visible(i, codes)]
+    i = st.selectbox("Question", shown, format_func=lambda i: QUESTIONS[i]["text"], key="whatif_q")
+    key = f"whatif_{QUESTIONS[i]['id']}_{codes[i]}"  # a fresh widget whenever the answer moves
+    st.radio("Answer", QUESTIONS[i]["opts"], index=codes[i] - 1 if codes[i] else None, horizontal=True,
+             key=key, on_change=whatif_pick, args=(i, key))
+
+    sim = QN.result_for(mask)
+    st.markdown(f'<div style="text-align:center;margin:8px 0;"><span class="pill {sim.probate_pill}">Probate: {sim.probate_label}</span> &nbsp; <span class="pill {sim.dispute_pill}">Dispute: {sim.dispute_label}</span></div>', unsafe_allow_html=True)
+    st.caption(f"Probate score {actual.probate_risk} → {sim.probate_risk}, dispute score {actual.dispute_risk} → {sim.dispute_risk}")
+    for act in actual.actions:
+        if act not in sim.actions:
+            st.markdown(f"~~{act}~~")
+    for act in sim.actions:
+        if act not in actual.actions:
+            st.markdown(f"**New:** {act}")
+
+    changed = sum(1 for a, b in zip(codes, QN.encode(st.session_state.answers)) if a != b)
+    reset_col, apply_col = st.columns(2)
+    with reset_col:
+        st.button("Reset", use_container_width=True, disabled=not changed, key="whatif_reset",
+                  on_click=st.session_state.pop, args=("whatif",))
+    with apply_col:
+        if st.button(f"Use these answers ({changed} changed)", use_container_width=True, disabled=not changed, key="whatif_apply"):
+            st.session_state.answers = AnswerState.from_codes(QN, codes)
+            st.session_state.pop("whatif"); st.session_state.pop("trail", None)
+            st.rerun()  # the whole page: new report, new link, new PDF
+
+PDF_WAIT = 0.25  # seconds the results page waits inline for its PDF
+
+def retry_pdf():
+    st.session_state.pop("pdf", None)
+
+def pdf_download(job, name):
+    # job: the render's Future, None if it was refused, or the exception it failed with
+    if job is not None and not isinstance(job, Exception) and job.done() and job.exception() is not None:
+        job = job.exception()
+        st.session_state.pdf = (st.session_state.pdf[0], job)  # keep only the error, so reruns don't raise it
+        if not isinstance(job, TimeoutError):
+            log.error("PDF report failed to render", exc_info=job)
+    if job is None or isinstance(job, Exception):
+        if job is None or isinstance(job, TimeoutError):
+            # refused at the door or dropped from the queue: many reports are being made right now
+            st.warning("We're preparing a lot of reports right now.")
         else:
-            dispute_risk += 2; probate_risk += 1; add("Revoke informal access. Consider an Enduring Power of Attorney (EPA) if help is needed."); add("Keep a simple log of legitimate expenses paid by helpers on your behalf.")
-    if a.get("q_bank_joint") == "No": add("Consider a joint account for shared household expenses to ease continuity for a partner.")
-    if a.get("q_investments") == "Yes": probate_risk += 1; add("Hold investments via nominee accounts or trusts to simplify transfer.")
-    if a.get("q_multiple_brokers") == "Yes": add("Consolidate accounts to reduce admin burden on your executor.")
-
-    if a.get("q_life") == "Yes" and a.get("q_life_beneficiary") == "No": probate_risk += 1; add("Add a named beneficiary to life insurance so it bypasses probate.")
-    if a.get("q_pension") == "Yes" and a.get("q_pension_beneficiary") == "No": probate_risk += 1; add("File a pension beneficiary nomination with your provider.")
-    if a.get("q_death_in_service") == "Yes": add("Confirm your employer nomination for death-in-service benefits.")
-
-    if a.get("q_will") == "No": probate_risk += 2; add("Make a valid will—without one, intestacy rules apply.")
-    if a.get("q_will") == "Yes" and a.get("q_will_recent") == "No": probate_risk += 1; add("Review/update your will (aim every 3 years or upon life changes).")
-    if a.get("q_will_stored") == "No": add("Store your will with your solicitor or register a copy with the Probate Office.")
-    if a.get("q_executor_informed") == "No": add("Inform your executor that they are named and where documents are kept.")
-    if a.get("q_lifetime_gifts") == "Yes": add("Have a solicitor review documentation for lifetime gifts/trusts.")
-
-    if a.get("q_business") == "Yes": probate_risk += 1; add("Create a succession/shareholder plan for your business interests.")
-    if a.get("q_farmland") == "Yes": add("Explore Agricultural or Business Relief to optimize tax and transfer.")
-    if a.get("q_digital") == "Yes": add("Document a digital asset plan (locations, instructions, and access).")
-    if a.get("q_expect_inherit") == "Yes": add("Coordinate your plan if you expect to inherit—timing/structure can reduce complexity.")
-
-    def label(score, thresholds=(2,4)):
-        if score <= thresholds[0]: return "Low"
-        elif score <= thresholds[1]: return "Moderate"
-        else: return "High"
-    probate_label = label(probate_risk)
-    dispute_label = "Low" if dispute_risk == 0 else ("Elevated" if dispute_risk == 1 else "Critical")
-    pill_p = "pill-low" if probate_label=="Low" else ("pill-mod" if probate_label=="Moderate" else "pill-high")
-    pill_d = "pill-low" if dispute_label=="Low" else ("pill-mod" if dispute_label=="Elevated" else "pill-high")
+            st.warning("Something went wrong preparing your PDF report.")
+        st.button("Try the PDF again", on_click=retry_pdf, use_container_width=True)
+    elif job.done():
+        st.download_button("Download Report (PDF)", data=job.result(), file_name=f"{name}_report.pdf",
+                           mime="application/pdf", use_container_width=True)
+    else:
+        pdf_pending(job)
+
+@fragment
+def email_report(token):
+    # Only queues the email (prebate.mail); rendering and SMTP happen on the mail workers.
+    with st.form("email_form", clear_on_submit=True, border=False):
+        address = st.text_input("Email this report to", placeholder="name@example.com")
+        sent = st.form_submit_button("Send the report")
+    if sent:
+        try:
+            mail.enqueue(token, address)
+            st.success(f"On its way to {address.strip()}. It may take a few minutes to arrive.")
+        except mail.MailError as e:
+            st.error(str(e))
+
+@fragment(run_every=1)
+def pdf_pending(job):
+    # Polls on its own; the rest of the page (and everyone else's clicks) carries on.
+    if job.done():
+        st.rerun()
+    st.info("Your PDF report is being prepared…")
+    st.button("Download Report (PDF)", disabled=True, use_container_width=True, key="pdf_pending")
+
+if st.session_state.completed:
+    result = QN.score(st.session_state.answers)
+    probate_risk, dispute_risk = result.probate_risk, result.dispute_risk
+    probate_label, dispute_label = result.probate_label, result.dispute_label
+    pill_p, pill_d = result.probate_pill, result.dispute_pill
+    actions = result.actions
+    token = tokens.issue(TENANT, st.session_state.answers)
+    if st.query_params.get("r") != token:
+        st.query_params["r"] = token
+    st.session_state.token = token
 
     st.markdown(f'<div style="text-align:center;margin-top:12px;"><span class="pill {pill_p}">Probate: {probate_label}</span> &nbsp; <span class="pill {pill_d}">Dispute: {dispute_label}</span></div>', unsafe_allow_html=True)
     st.markdown("### Recommended Actions")
     for i, act in enumerate(actions, start=1):
         st.markdown(f"{i}. {act}")
 
-    def build_pdf():
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem, Image as RLImage
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name="TitlePB", fontSize=18, leading=22, textColor=colors.HexColor("#10243D"), spaceAfter=12))
-        styles.add(ParagraphStyle(name="H2PB", fontSize=13, leading=16, textColor=colors.HexColor("#10243D"), spaceAfter=6))
-        styles.add(ParagraphStyle(name="BodyPB", fontSize=11, leading=16, textColor=colors.HexColor("#111827")))
-        story = [Paragraph("PreBate – Estate Readiness Report", styles["TitlePB"]),
-                 Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles["BodyPB"]),
-                 Spacer(1, 8),
-                 Paragraph(f"<b>Probate Risk:</b> {probate_label} (score {probate_risk})", styles["BodyPB"]),
-                 Paragraph(f"<b>Dispute Risk:</b> {dispute_label} (score {dispute_risk})", styles["BodyPB"]),
-                 Spacer(1, 10),
-                 Paragraph("Recommended Actions", styles["H2PB"])]
-        if actions:
-            items = [ListItem(Paragraph(x, styles["BodyPB"])) for x in actions]
-            story.append(ListFlowable(items, bulletType='1', start='1'))
-        else:
-            story.append(Paragraph("No immediate actions detected.", styles["BodyPB"]))
-        doc.build(story)
-        pdf = buffer.getvalue(); buffer.close(); return pdf
+    # Render once per result, on the shared render pool (prebate.render) and
+    # through the report cache shared by all replicas (prebate.cache): reruns
+    # (e.g. the download click itself) reuse the same job and bytes object,
+    # which is also what Streamlit's media store keeps.
+    if st.session_state.get("pdf", (None,))[0] != token:
+        # The stamp is part of the key, so it is the day only: every view of this result
+        # that day shares one cached PDF, rather than one per minute.
+        generated = date.today()
+        key = report.report_key(TENANT, result, generated=generated)
+        try:
+            job = render.submit(key, cache.reports().get, key,
+                                lambda: report.build_pdf(TENANT, result, generated, invariant=True))
+            wait([job], timeout=PDF_WAIT)  # most renders finish in a few ms; don't flash the placeholder
+        except render.Overloaded:
+            job = None
+        st.session_state.pdf = (token, job)
+    name = TENANT.slug or "prebate"
+    pdf_col, html_col = st.columns(2)
+    with pdf_col:
+        pdf_download(st.session_state.pdf[1], name)
+    with html_col:
+        st.download_button("Printable Report (HTML)", data=printable.build_html(TENANT, st.session_state.answers),
+                           file_name=f"{name}_report.html", mime="text/html", use_container_width=True)
+
+    if mail.enabled():
+        email_report(token)
+
+    skipped = unanswered()
+    if skipped:
+        st.caption(f"You finished early and skipped {skipped} question{'s' * (skipped != 1)}; "
+                   "your recommended actions may be incomplete.")
+    st.caption("Bookmark this page or share its address to reopen this report later. Your answers are kept in the link, not on our servers.")
+    if os.environ.get("PREBATE_REPORT_URL"):  # where prebate.serve answers /report/<token>.pdf
+        st.caption(f"[Direct link to this PDF]({os.environ['PREBATE_REPORT_URL'].rstrip('/')}/report/{token}.pdf)")
 
-    pdf_bytes = build_pdf()
-    st.download_button("Download Report (PDF)", data=pdf_bytes, file_name="prebate_report.pdf", mime="application/pdf")
+    review()
+    with st.expander("What if…? Try different answers"):
+        what_if(token, result)
 
     if st.button("Start Over"):
-        st.session_state.step = 0; st.session_state.answers = {}; st.session_state.completed = False; st.rerun()
+        st.session_state.step = 0; st.session_state.answers = AnswerState(QN); st.session_state.completed = False
+        st.session_state.pop("pdf", None); st.session_state.pop("whatif", None); st.session_state.pop("resume", None)
+        st.session_state.pop("trail", None)
+        st.query_params.pop("r", None)
+        if TENANT.slug: st.query_params["tenant"] = TENANT.slug
+        st.rerun()
@@ -0,0 +1,188 @@
+import streamlit as st
+import hmac
+import io
+import itertools
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+
+from prebate import bulk, mail, store
+
+# Reports per download from this page: Streamlit holds a download's whole file in
+# memory (and in its media store), so the page renders no more than this at once.
+DOWNLOAD_LIMIT = 1000
+
+st.set_page_config(
+    page_title="PreBate – Adviser tools",
+    page_icon="🧾",
+    layout="centered",
+)
+
+def signed_in():
+    password = os.environ.get("PREBATE_ADMIN_PASSWORD")
+    if not password:
+        st.info("Adviser tools are switched off. Set PREBATE_ADMIN_PASSWORD on the server to enable them.")
+        return False
+    if st.session_state.get("adviser"):
+        return True
+    entered = st.text_input("Adviser password", type="password")
+    if entered and hmac.compare_digest(entered.encode(), password.encode()):
+        st.session_state.adviser = True
+        st.rerun()
+    if entered:
+        st.error("Wrong password.")
+    return False
+
+def upload_rows(upload, problems):
+    fmt = "csv" if upload.name.lower().endswith(".csv") else "jsonl"
+    def errors(line, message):
+        problems.append(f"line {line}: {message}")
+    return bulk.read_rows(io.TextIOWrapper(upload, encoding="utf-8", newline=""), fmt), errors
+
+def show_problems(problems):
+    if problems:
+        st.warning(f"{len(problems)} record(s) skipped.")
+        st.code("\n".join(problems[:100]), language=None)
+
+def newer_page(pages):
+    pages.pop()
+
+def older_page(pages, cursor):
+    pages.append(cursor)
+
+def client_list():
+    # Every filter and sort is an index range in prebate.store; pages are keyset cursors, not offsets.
+    db = store.store()
+    st.header("Clients")
+    probate_col, dispute_col = st.columns(2)
+    probate = probate_col.selectbox("Probate", ["Any"] + db.labels("probate"))
+    dispute = dispute_col.selectbox("Dispute", ["Any"] + db.labels("dispute"))
+    action = st.selectbox("Recommended action", ["Any"] + db.actions())
+    dates_col, notes_col = st.columns(2)
+    dates = dates_col.date_input("Assessed between", value=(), format="YYYY-MM-DD")
+    notes = notes_col.text_input("Notes mention")
+    order = st.radio("Sort", list(store.ORDERS), format_func=lambda o: store.ORDERS[o][1], horizontal=True)
+    filters = store.Filters(
+        probate_label="" if probate == "Any" else probate,
+        dispute_label="" if dispute == "Any" else dispute,
+        action="" if action == "Any" else action,
+        since=datetime.combine(dates[0], time.min).timestamp() if dates else None,
+        until=datetime.combine(dates[1] + timedelta(days=1), time.min).timestamp() if len(dates) > 1 else None,
+        notes=notes,
+    )
+
+    # The start of each page seen so far; a new filter or sort starts again at the first.
+    if st.session_state.get("clients_view") != (filters, order):
+        st.session_state.clients_view = (filters, order)
+        st.session_state.clients_pages = [None]
+    pages = st.session_state.clients_pages
+    rows, cursor = db.page(filters, order, pages[-1])
+    if not rows:
+        st.info("No clients match.")
+        return
+
+    app_url = os.environ.get("PREBATE_APP_URL")
+    sep = "&" if app_url and "?" in app_url else "?"
+    st.dataframe([{
+        "Client": row.client,
+        "Assessed": datetime.fromtimestamp(row.created).strftime("%Y-%m-%d %H:%M"),
+        "Probate": f"{row.probate_label} ({row.probate_risk})",
+        "Dispute": f"{row.dispute_label} ({row.dispute_risk})",
+        "Email": row.email,
+        "Notes": row.notes,
+        **({"Report": f"{app_url}{sep}r={row.token}"} if app_url else {}),
+    } for row in rows], use_container_width=True, hide_index=True,
+        column_config={"Report": st.column_config.LinkColumn(display_text="Open")})
+    newer_col, page_col, older_col = st.columns(3)
+    newer_col.button("← Previous", disabled=len(pages) == 1, on_click=newer_page, args=(pages,),
+                     use_container_width=True)
+    page_col.caption(f"Page {len(pages)}")
+    older_col.button("Next →", disabled=cursor is None, on_click=older_page, args=(pages, cursor),
+                     use_container_width=True)
+
+    chosen = st.selectbox("Notes for", rows, format_func=lambda row: f"{row.client} ({row.id})")
+    with st.form("notes_form", border=False):
+        text = st.text_area("Notes", value=chosen.notes, key=f"notes_{chosen.id}")
+        if st.form_submit_button("Save notes"):
+            db.set_notes(chosen.id, text)
+            st.rerun()
+
+def render_reports(upload, ext):
+    problems = []
+    rows, errors = upload_rows(upload, problems)
+    rows = list(itertools.islice(rows, DOWNLOAD_LIMIT + 1))
+    if len(rows) > DOWNLOAD_LIMIT:
+        st.error(f"This page renders at most {DOWNLOAD_LIMIT} records per download. Split the file, or run "
+                 "`python -m prebate.bulk` on the server for one big archive.")
+        return
+    with tempfile.TemporaryFile() as out, st.spinner("Rendering reports…"):
+        count = bulk.export(rows, out, ext, errors)
+        out.flush()
+        with open(out.fileno(), "rb", closefd=False) as archive:
+            st.download_button(f"Download {count} report(s)", data=archive, file_name=f"prebate_reports.{ext}",
+                               mime="application/zip" if ext == "zip" else "application/pdf")
+    show_problems(problems)
+
+def queue_emails(upload):
+    problems = []
+    rows, errors = upload_rows(upload, problems)
+    count = mail.enqueue_many(mail.rows_to_items(rows, errors))
+    st.success(f"{count} email(s) queued.")
+    show_problems(problems)
+
+def save_clients(upload):
+    problems = []
+    rows, errors = upload_rows(upload, problems)
+    with st.spinner("Scoring and saving…"):
+        count = store.store().add(store.rows_to_records(rows, errors))
+    st.success(f"{count} client(s) saved.")
+    show_problems(problems)
+
+if mail.enabled():
+    mail.start()
+
+st.title("Adviser tools")
+if not signed_in():
+    st.stop()
+
+if store.enabled():
+    client_list()
+
+st.header("Bulk export")
+st.caption("Upload one record per client: a JSON line or CSV row with a `client` name and either a "
+           "result `token` or the answers (question ids as keys/columns). Downloads are limited to "
+           f"{DOWNLOAD_LIMIT} records.")
+upload = st.file_uploader("Answer records", type=["jsonl", "json", "csv"])
+outputs = ["ZIP of individual reports", "One merged PDF"]
+if mail.enabled():
+    outputs.append("Email each client")
+    st.caption("To email reports, give each record an `email` too. Emails are queued and sent in the background.")
+if store.enabled():
+    outputs.append("Save to the client list")
+    st.caption("Saved clients keep their `email` and, if given, the `date` (YYYY-MM-DD) they were assessed.")
+kind = st.radio("Output", outputs, horizontal=True)
+
+if upload is not None:
+    if kind == "Email each client":
+        if st.button("Queue emails", type="primary"):
+            queue_emails(upload)
+    elif kind == "Save to the client list":
+        if st.button("Save clients", type="primary"):
+            save_clients(upload)
+    elif st.button("Render reports", type="primary"):
+        render_reports(upload, "zip" if kind.startswith("ZIP") else "pdf")
+
+if mail.enabled():
+    st.header("Email queue")
+    counts = mail.outbox().counts()
+    queued_col, sent_col, failed_col = st.columns(3)
+    queued_col.metric("Waiting", counts["queued"])
+    sent_col.metric("Sent", counts["sent"])
+    failed_col.metric("Failed", counts["failed"])
+    if counts["failed"]:
+        st.dataframe([dict(zip(("Recipient", "Client", "Attempts", "Error"), row)) for row in mail.outbox().failures()],
+                     use_container_width=True)
+        if st.button("Retry failed emails"):
+            mail.outbox().requeue_failed()
+            mail.wake()
+            st.rerun()
@@ -0,0 +1 @@
+"""Shared PreBate engine used by the Streamlit app and the command-line tools."""
@@ -0,0 +1,145 @@
+"""Rule coverage analysis.
+
+    python -m prebate.analyze [versions...] [--tenant SLUG]
+
+Considers only answer sets a respondent can actually finish with: every
+visible question answered and every question hidden by ``show_if`` left
+blank. Questions tied together by a rule or a ``show_if`` link are enumerated
+as a group (``Questionnaire.groups``), and the groups are combined by
+convolving their score distributions, so the whole space (millions of answer
+sets) is covered exactly in milliseconds. Reports:
+
+* rules no finished questionnaire can fire, and actions no rule emits;
+* actions shared by rules that can fire together (the duplicate is dropped);
+* the score range and share of answer sets behind every label band.
+
+Exits with status 1 when a rule is unreachable or an action unused.
+"""
+
+import argparse
+import itertools
+import sys
+from collections import Counter
+
+from prebate import engine, tenants
+
+
+class Analysis:
+    def __init__(self, qn):
+        self.qn = qn
+        self.fires = 0  # rules fired by at least one finished questionnaire
+        self.together = []  # per group: set of fired-rule masks seen
+        scores = Counter({(0, 0): 1})
+        for _, _, finishes in qn.groups():
+            masks, dist = set(), Counter()
+            for _, probate, dispute, mask in finishes:
+                masks.add(mask)
+                dist[probate, dispute] += 1
+            for mask in masks:
+                self.fires |= mask
+            self.together.append(masks)
+            scores = _convolve(scores, dist)
+        self.scores = scores
+        self.total = sum(scores.values())
+
+    def can_fire_together(self, a, b):
+        pair = 1 << a | 1 << b
+        for masks in self.together:
+            if any(m & pair == pair for m in masks):
+                return True
+        ga = next(n for n, masks in enumerate(self.together) if any(m >> a & 1 for m in masks))
+        gb = next(n for n, masks in enumerate(self.together) if any(m >> b & 1 for m in masks))
+        return ga != gb  # independent groups: each fires in some answer set of its own
+
+    def unreachable_rules(self):
+        return [r[0] for n, r in enumerate(self.qn.rules) if not self.fires >> n & 1]
+
+    def unused_actions(self):
+        used = {a for _, _, _, _, acts in self.qn.rules for a in acts}
+        return [a for n, a in enumerate(self.qn.action_ids) if n not in used]
+
+    def shared_actions(self):
+        """``[(action id, [rule ids], dropped)]`` for actions listed by more than one rule."""
+        by_action = {}
+        for n, (_, _, _, _, acts) in enumerate(self.qn.rules):
+            for a in acts:
+                by_action.setdefault(a, []).append(n)
+        out = []
+        for a, rules in by_action.items():
+            if len(rules) > 1:
+                live = [n for n in rules if self.fires >> n & 1]
+                dropped = any(self.can_fire_together(x, y) for x, y in itertools.combinations(live, 2))
+                out.append((self.qn.action_ids[a], [self.qn.rules[n][0] for n in rules], dropped))
+        return out
+
+    def bands(self, kind):
+        """``[(label, lowest score, highest score, answer sets)]`` for each band of ``kind``."""
+        axis = 0 if kind == "probate" else 1
+        dist = Counter()
+        for pair, count in self.scores.items():
+            dist[pair[axis]] += count
+        out = []
+        for _, label, _ in self.qn.labels[kind]:
+            hits = sorted(s for s in dist if self.qn.label(kind, s)[0] == label)
+            out.append((label, hits[0] if hits else None, hits[-1] if hits else None,
+                        sum(dist[s] for s in hits)))
+        return out
+
+
+def _convolve(a, b):
+    out = Counter()
+    for (p1, d1), n1 in a.items():
+        for (p2, d2), n2 in b.items():
+            out[p1 + p2, d1 + d2] += n1 * n2
+    return out
+
+
+def report(name, analysis, out=sys.stdout):
+    qn = analysis.qn
+    print(f"{name}: {len(qn.questions)} questions, {len(qn.rules)} rules, {len(qn.action_ids)} actions, "
+          f"{analysis.total:,} finished answer sets", file=out)
+    print(f"  unreachable rules: {', '.join(analysis.unreachable_rules()) or 'none'}", file=out)
+    print(f"  unused actions: {', '.join(analysis.unused_actions()) or 'none'}", file=out)
+    for action, rules, dropped in analysis.shared_actions():
+        note = "duplicate dropped when they fire together" if dropped else "never fire together"
+        print(f"  shared action {action}: {', '.join(rules)} ({note})", file=out)
+    for kind in ("probate", "dispute"):
+        parts = []
+        for label, lo, hi, count in analysis.bands(kind):
+            if count:
+                span = str(lo) if lo == hi else f"{lo}..{hi}"
+                parts.append(f"{label} {span} ({count / analysis.total:.1%})")
+            else:
+                parts.append(f"{label} unreachable")
+        print(f"  {kind}: {'; '.join(parts)}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report unreachable rules, shared actions and score ranges.")
+    parser.add_argument("versions", nargs="*", help="questionnaire versions (default: all)")
+    parser.add_argument("--tenant", action="append", default=[], metavar="SLUG",
+                        help="also analyse a tenant's weighted rules (repeatable)")
+    args = parser.parse_args(argv)
+    targets = []
+    try:
+        targets += [(v, engine.load(v)) for v in args.versions or engine.versions()]
+        targets += [(f"tenant {s}", tenants.load(s).questionnaire) for s in args.tenant]
+    except (LookupError, engine.DefinitionError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    status = 0
+    for name, qn in targets:
+        try:
+            analysis = Analysis(qn)
+        except engine.DefinitionError as e:
+            print(f"{name}: error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        report(name, analysis)
+        if analysis.unreachable_rules() or analysis.unused_actions():
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
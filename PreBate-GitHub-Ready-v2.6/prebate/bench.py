@@ -0,0 +1,97 @@
+"""Rendering benchmark.
+
+    python -m prebate.bench [-n 200] [--tenant SLUG] [--max-bytes N]
+
+Times the template (canvas) renderer against the full Platypus layout for a
+spread of answer sets and prints per-report timings and the speed-up, then
+the average report size for each size option (stream compression, font
+embedding, logo). With ``--max-bytes`` it exits with status 1 when the
+tenant's own reports average more than N bytes, as a size regression check.
+
+Most of what remains of a template render is ReportLab writing the document
+out (``canvas.save``); font metrics and line wrapping are a few percent. That
+part is several times faster with ReportLab's C accelerator
+(``reportlab[accel]``), and the benchmark says when it is missing.
+"""
+
+import argparse
+import dataclasses
+import importlib.util
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from prebate import report, tenants
+from prebate.state import AnswerState
+
+
+def samples(qn, n, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        codes = bytearray(rng.randint(0, len(q["opts"])) for q in qn.questions)
+        out.append(qn.score(AnswerState.from_codes(qn, codes)))
+    return out
+
+
+SIZE_OPTIONS = [  # label, tenant overrides, build_pdf options
+    ("uncompressed", {}, {"compress": False}),
+    ("compressed", {}, {}),
+    ("subset fonts", {"pdf_fonts": "subset"}, {}),
+    ("with logo", {"pdf_logo": True}, {}),
+    ("subset + logo", {"pdf_fonts": "subset", "pdf_logo": True}, {}),
+]
+
+
+def timed(tenant, results, generated, fast, **options):
+    start = time.perf_counter()
+    size = 0
+    for result in results:
+        size += len(report.build_pdf(tenant, result, generated, fast=fast, **options))
+    return (time.perf_counter() - start) / len(results), size / len(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF report rendering.")
+    parser.add_argument("-n", type=int, default=200, help="reports per renderer (default: 200)")
+    parser.add_argument("--tenant", help="tenant slug (default: the built-in PreBate branding)")
+    parser.add_argument("--max-bytes", type=int, help="fail if the tenant's reports average more than this")
+    args = parser.parse_args(argv)
+
+    tenant = tenants.load(args.tenant) if args.tenant else tenants.default()
+    results = samples(tenant.questionnaire, max(args.n, 1))
+    generated = datetime(2000, 1, 1)
+    timed(tenant, results[:5], generated, True)  # import ReportLab and warm the caches
+    timed(tenant, results[:5], generated, False)
+    fast, fast_size = timed(tenant, results, generated, True)
+    slow, slow_size = timed(tenant, results, generated, False)
+    print(f"platypus  {slow * 1000:8.2f} ms/report  {slow_size:8.0f} bytes")
+    print(f"template  {fast * 1000:8.2f} ms/report  {fast_size:8.0f} bytes")
+    print(f"speed-up  {slow / fast:8.1f}x")
+    if importlib.util.find_spec("_rl_accel") is None:
+        print("(ReportLab's C accelerator is not installed: pip install 'reportlab[accel]')")
+
+    print()
+    for label, overrides, options in SIZE_OPTIONS:
+        variant = dataclasses.replace(tenant, **overrides)
+        if variant.pdf_logo and not variant.logo_path:
+            print(f"{label:14s}  (no logo file)")
+            continue
+        seconds, size = timed(variant, results, generated, True, **options)
+        print(f"{label:14s}  {size:8.0f} bytes  {seconds * 1000:6.2f} ms/report")
+    if tenant.logo_path:
+        jpeg = report._logo(tenant.logo_path)
+        if jpeg:
+            print(f"logo            {os.path.getsize(tenant.logo_path):8d} bytes as given, {len(jpeg[0])} embedded")
+
+    own = timed(tenant, results, generated, True)[1]
+    if args.max_bytes and own > args.max_bytes:
+        print(f"error: reports average {own:.0f} bytes, over the {args.max_bytes} byte budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Bulk report export for advisers.
+
+Reads answer records and writes either a ZIP with one PDF per client or one
+merged PDF with a page per client:
+
+    python -m prebate.bulk clients.jsonl --zip reports.zip
+    python -m prebate.bulk clients.csv --pdf reports.pdf
+
+A record is a JSON line or CSV row with a ``client`` name and either a result
+``token`` or the answers themselves (question-id columns in CSV, or an
+``answers`` object in JSON), plus optional ``tenant`` and ``version``.
+
+Records are read, scored and rendered one at a time and each ZIP entry is
+written as soon as it is rendered, so memory stays flat however many
+clients are exported.
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import zipfile
+from datetime import datetime
+
+from prebate import engine, report, tenants, tokens
+from prebate.state import AnswerState
+
+
+class RecordError(ValueError):
+    pass
+
+
+def read_rows(fp, fmt):
+    """Yield ``(line, row dict)`` pairs from a JSONL or CSV text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(fp)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(fp, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            yield line, RecordError(f"invalid JSON: {e}")
+            continue
+        yield line, row if isinstance(row, dict) else RecordError("expected a JSON object")
+
+
+def to_record(row):
+    """Row dict -> ``(client, tenant, AnswerState)``; raises RecordError."""
+    client = str(row.get("client") or "").strip()
+    if row.get("token"):
+        try:
+            tenant, answers = tokens.read(str(row["token"]).strip())
+        except tokens.TokenError as e:
+            raise RecordError(str(e)) from None
+        return client, tenant, answers
+    try:
+        tenant = (tenants.load(str(row["tenant"])) if row.get("tenant")
+                  else tenants.default(str(row.get("version") or engine.DEFAULT_VERSION)))
+    except (LookupError, tenants.TenantError, engine.DefinitionError) as e:  # unknown, or its file is broken
+        raise RecordError(str(e)) from None
+    values = row.get("answers", row)
+    if not isinstance(values, dict):
+        raise RecordError("'answers' must be an object")
+    qn = tenant.questionnaire
+    wrong = sorted(k for k, v in values.items() if k in qn.index and v and not isinstance(v, str))
+    if wrong:
+        raise RecordError(f"answers must be strings: {', '.join(wrong)}")
+    try:
+        answers = AnswerState(qn, {k: v for k, v in values.items() if k in qn.index and v})
+    except ValueError as e:
+        raise RecordError(str(e)) from None
+    if not answers:
+        raise RecordError("no answers or token")
+    return client, tenant, answers
+
+
+def reports(rows, errors):
+    """Turn rows into ``(client, tenant, Result)``, passing bad rows to ``errors(line, message)``."""
+    for line, row in rows:
+        try:
+            if isinstance(row, RecordError):
+                raise row
+            client, tenant, answers = to_record(row)
+        except RecordError as e:
+            errors(line, str(e))
+            continue
+        yield client or f"Client {line}", tenant, tenant.questionnaire.score(answers)
+
+
+def entry_name(n, client):
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", client).strip("-").lower()[:60] or "client"
+    return f"{n:05d}-{slug}.pdf"
+
+
+def write_zip(fp, reports, generated=None):
+    """Stream one PDF per report into a ZIP written to ``fp`` (which need not be seekable)."""
+    generated = generated or datetime.now()
+    count = 0
+    with zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for count, (client, tenant, result) in enumerate(reports, start=1):
+            with zf.open(entry_name(count, client), "w", force_zip64=True) as entry:
+                report.write_pdf(entry, tenant, result, generated, client)
+    return count
+
+
+def export(rows, fp, kind, errors):
+    if kind == "zip":
+        return write_zip(fp, reports(rows, errors))
+    return report.write_merged_pdf(fp, reports(rows, errors), datetime.now())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render PreBate reports for many clients at once.")
+    parser.add_argument("records", help="JSONL or CSV file of answer records ('-' for stdin)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from the file name)")
+    out = parser.add_mutually_exclusive_group(required=True)
+    out.add_argument("--zip", metavar="PATH", help="write a ZIP of individual reports ('-' for stdout)")
+    out.add_argument("--pdf", metavar="PATH", help="write one merged PDF with a page per client ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.records.lower().endswith(".csv") else "jsonl")
+    kind, target = ("zip", args.zip) if args.zip else ("pdf", args.pdf)
+    failed = 0
+
+    def errors(line, message):
+        nonlocal failed
+        failed += 1
+        print(f"{args.records}:{line}: skipped: {message}", file=sys.stderr)
+
+    src = sys.stdin if args.records == "-" else open(args.records, newline="", encoding="utf-8")
+    dst = sys.stdout.buffer if target == "-" else open(target, "wb")
+    with src, dst:
+        count = export(read_rows(src, fmt), dst, kind, errors)
+    print(f"{count} report(s) written, {failed} record(s) skipped", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""Rendered-report cache shared across replicas.
+
+    PREBATE_CACHE_URL unset                          # this process only
+    PREBATE_CACHE_URL=file:///var/cache/prebate      # a directory every replica mounts
+    PREBATE_CACHE_URL=sqlite:///var/cache/prebate.db  # one SQLite file (single host)
+    PREBATE_CACHE_URL=redis://cache:6379/0           # any Redis-protocol server
+
+Lookups try a small in-process LRU first, then the shared tier. Misses are
+single-flight: within a process one thread computes while the others wait
+on it, and across the fleet the computing replica holds a short lease
+(``SET NX PX``, an insert-or-ignore row or an ``O_EXCL`` lock file) while
+the others poll the shared tier for its result. A failing shared tier is
+logged and bypassed; it never fails a report.
+
+Shared entries live for ``TTL``: Redis expires them itself, the SQLite tier
+deletes expired rows whenever it writes, and the file tier sweeps expired
+files at most once every ``SWEEP`` seconds per process.
+"""
+
+import logging
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+log = logging.getLogger(__name__)
+
+URL_ENV = "PREBATE_CACHE_URL"
+LOCAL_BYTES = 64 << 20  # in-process tier
+TTL = 7 * 24 * 3600  # seconds a shared entry lives
+LEASE = 30.0  # seconds one replica may hold a key before others compute it themselves
+POLL = 0.05
+SWEEP = 3600.0  # seconds between sweeps of expired files from a file:// cache
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class CacheError(Exception):
+    pass
+
+
+class LRU:
+    def __init__(self, max_bytes=LOCAL_BYTES):
+        self.max_bytes, self.size = max_bytes, 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            self.size += len(value) - (len(old) if old is not None else 0)
+            self._items[key] = value
+            while self.size > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self.size -= len(dropped)
+
+
+class FileBackend:
+    """One file per key under ``root``, written atomically; leases are ``O_EXCL`` lock files."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._swept = None  # monotonic time of this process's last sweep
+
+    def _path(self, key):
+        return self.root / key[:2] / key
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > TTL:
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(value)
+        os.replace(tmp, path)
+        if self._swept is None or time.monotonic() - self._swept > SWEEP:
+            self._swept = time.monotonic()
+            self.sweep()
+
+    def sweep(self):
+        """Delete entries (and leftover lock and temporary files) older than the TTL."""
+        cutoff = time.time() - TTL
+        for path in self.root.glob("*/*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:  # another replica got there first
+                pass
+
+    def lease(self, key):
+        lock = self._path(key).with_suffix(".lock")
+        lock.parent.mkdir(exist_ok=True)
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > LEASE:  # the holder died
+                    lock.unlink()
+            except FileNotFoundError:
+                pass
+            return False
+
+    def release(self, key):
+        self._path(key).with_suffix(".lock").unlink(missing_ok=True)
+
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._db() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires REAL)")
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def get(self, key):
+        row = self._db().execute("SELECT value FROM cache WHERE key = ? AND expires > ?",
+                                 (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._db() as db:
+            db.execute("DELETE FROM cache WHERE expires <= ?", (now,))  # an index range; usually empty
+            db.execute("DELETE FROM leases WHERE expires <= ?", (now,))  # left by replicas that died holding one
+            db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, value, now + TTL))
+
+    def lease(self, key):
+        now = time.time()
+        with self._db() as db:
+            db.execute("DELETE FROM leases WHERE key = ? AND expires <= ?", (key, now))
+            return db.execute("INSERT OR IGNORE INTO leases VALUES (?, ?)", (key, now + LEASE)).rowcount == 1
+
+    def release(self, key):
+        with self._db() as db:
+            db.execute("DELETE FROM leases WHERE key = ?", (key,))
+
+
+class RedisBackend:
+    """The handful of commands needed, spoken over RESP directly (no client library)."""
+
+    # Drop the lease only if it is still ours: a holder that overran LEASE must not free another's.
+    RELEASE = 'if redis.call("GET", KEYS[1]) == ARGV[1] then return redis.call("DEL", KEYS[1]) end return 0'
+
+    def __init__(self, host="localhost", port=6379, db=0, password=None, timeout=2.0, prefix="prebate:"):
+        self.address, self.db, self.password = (host, port), db, password
+        self.timeout, self.prefix = timeout, prefix
+        self._local = threading.local()  # one connection per thread
+        self._leases = {}  # key -> this process's lease value, while held
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection(self.address, self.timeout)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.password:
+                self._send(conn, "AUTH", self.password)
+            if self.db:
+                self._send(conn, "SELECT", self.db)
+        return conn
+
+    def _send(self, conn, *args):
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            a = a if isinstance(a, bytes) else str(a).encode()
+            out += [b"$%d\r\n" % len(a), a, b"\r\n"]
+        conn[0].sendall(b"".join(out))
+        return self._reply(conn[1])
+
+    def _reply(self, f):
+        line = f.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed by the cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise CacheError(rest.decode(errors="replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            return _read_exact(f, n + 2)[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._reply(f) for _ in range(n)]
+        raise CacheError(f"unexpected reply {line[:20]!r}")
+
+    def _call(self, *args):
+        try:
+            return self._send(self._conn(), *args)
+        except OSError:
+            conn = getattr(self._local, "conn", None)
+            self._local.conn = None
+            if conn:
+                conn[0].close()
+            raise
+
+    def get(self, key):
+        return self._call("GET", self.prefix + key)
+
+    def set(self, key, value):
+        self._call("SET", self.prefix + key, value, "EX", TTL)
+
+    def lease(self, key):
+        value = f"{os.getpid()}:{secrets.token_hex(8)}"
+        if self._call("SET", f"{self.prefix}{key}:lease", value, "NX", "PX", int(LEASE * 1000)) is None:
+            return False
+        self._leases[key] = value
+        return True
+
+    def release(self, key):
+        value = self._leases.pop(key, None)
+        if value is not None:
+            self._call("EVAL", self.RELEASE, 1, f"{self.prefix}{key}:lease", value)
+
+
+def _read_exact(f, n):
+    chunks = []
+    while n:
+        chunk = f.read(n)
+        if not chunk:
+            raise ConnectionError("connection closed by the cache server mid-reply")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+class TieredCache:
+    def __init__(self, shared=None, local=None):
+        self.shared = shared
+        self.local = local or LRU()
+        self._flights = {}  # key -> [lock, waiters]
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """The bytes cached under ``key``, computing them with ``compute()`` once on a miss."""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                value = self.local.get(key)
+                if value is None:
+                    value = self._fetch(key, compute)
+                    self.local.put(key, value)
+                return value
+        finally:
+            with self._lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[key]
+
+    def _fetch(self, key, compute):
+        if self.shared is None:
+            return compute()
+        value = self._shared("get", key)
+        if value is not None:
+            return value
+        deadline = time.monotonic() + LEASE
+        while not self._shared("lease", key, failed=True):
+            time.sleep(POLL)
+            value = self._shared("get", key)
+            if value is not None:
+                return value
+            if time.monotonic() > deadline:  # the holder is stuck; don't wait forever
+                return compute()
+        try:
+            value = compute()
+            self._shared("set", key, value)
+            return value
+        finally:
+            self._shared("release", key)
+
+    def _shared(self, op, *args, failed=None):
+        try:
+            return getattr(self.shared, op)(*args)
+        except (OSError, sqlite3.Error, CacheError) as e:
+            log.warning("shared cache %s failed: %s", op, e)
+            return failed
+
+
+def from_url(url):
+    """The shared tier named by a ``PREBATE_CACHE_URL`` value (None when empty)."""
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if parts.scheme == "file":
+        return FileBackend(unquote(parts.path))
+    if parts.scheme == "sqlite":
+        return SQLiteBackend(unquote(parts.path))
+    if parts.scheme == "redis":
+        db = parts.path.strip("/")
+        return RedisBackend(parts.hostname or "localhost", parts.port or 6379, int(db or 0),
+                            unquote(parts.password) if parts.password else None)
+    raise ValueError(f"{URL_ENV}: unsupported cache URL {url!r} (use file://, sqlite:// or redis://)")
+
+
+def reports():
+    """The process-wide report cache, configured from the environment on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TieredCache(from_url(os.environ.get(URL_ENV)))
+        return _cache
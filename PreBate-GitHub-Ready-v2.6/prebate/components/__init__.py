@@ -0,0 +1,37 @@
+"""Custom Streamlit components, written as plain HTML/JS so there is no build step.
+
+Each component is a directory next to this file holding an ``index.html``
+that speaks Streamlit's component protocol directly (``postMessage``), which
+is all the ``streamlit-component-lib`` npm package does for us.
+"""
+
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+FRONTEND = Path(__file__).resolve().parent
+
+_keys = components.declare_component("prebate_keys", path=str(FRONTEND / "keys"))
+_buttons = components.declare_component("prebate_buttons", path=str(FRONTEND / "buttons"))
+
+
+def keys(key=None, delay_ms=300):
+    """Listen for answer shortcuts on the page: Y, N, ? and Backspace.
+
+    Returns the latest batch ``{"seq": ..., "keys": ["y", "n", "?", "back", ...]}``
+    (or None): keys pressed within ``delay_ms`` of each other arrive together,
+    in a single rerun. ``seq`` changes with every batch, since the component
+    keeps returning its last value on later reruns.
+    """
+    return _keys(delay=delay_ms, key=key, default=None)
+
+
+def button_group(question, options, back=True, key=None):
+    """Render a question's answer buttons and Back as a single element.
+
+    ``options`` are ``(label, value, kind)`` triples, ``kind`` being ``yes``,
+    ``maybe`` or ``no`` for the colour. Returns the latest click as
+    ``{"seq": ..., "question": question, "value": value or "back"}``, or None.
+    """
+    return _buttons(question=question, options=[{"label": l, "value": v, "kind": k} for l, v, k in options],
+                    back=back, key=key, default=None)
@@ -0,0 +1,609 @@
+"""Questionnaire definitions: load, validate, compile and score.
+
+Each questionnaire version lives in ``questionnaires/<version>.json``. A definition
+is validated and compiled once, and the compiled form is cached with ``marshal``
+next to it (``__pycache__``, keyed by the file's SHA-256) so later processes skip
+parsing and validation. Loaded versions are kept side by side and picked up
+again when their file changes on disk, without restarting the server.
+"""
+
+import copy
+import hashlib
+import itertools
+import json
+import logging
+import marshal
+import os
+import sys
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import NamedTuple
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "questionnaires"
+DEFAULT_VERSION = "2.6"
+FORMAT = 1  # bump whenever the compiled layout below changes
+QUESTION_TYPES = ("yn", "ynm")
+PILLS = ("pill-low", "pill-mod", "pill-high")
+MAX_OPTS = 3  # answer codes 0..3 (0 = unanswered) must fit in two bits
+MAX_BLOCK = 6  # questions per outcome-table block: at most 4**6 entries each
+WEIGHT_BITS = 16
+
+
+class DefinitionError(ValueError):
+    pass
+
+
+class Outlook(NamedTuple):
+    """Where a partly answered questionnaire can still end up (see ``Questionnaire.outlook``)."""
+    probate: tuple  # (lowest, highest) reachable score
+    dispute: tuple
+    labels_settled: bool
+    actions_settled: bool
+    next_question: object  # most decisive question still to ask, or None
+
+
+class Result(NamedTuple):
+    probate_risk: int
+    dispute_risk: int
+    probate_label: str
+    dispute_label: str
+    probate_pill: str
+    dispute_pill: str
+    actions: tuple
+    action_ids: tuple
+
+
+def compile_definition(raw, source="definition"):
+    """Validate a parsed definition and return its compiled, marshal-able form."""
+    def fail(msg):
+        raise DefinitionError(f"{source}: {msg}")
+
+    if not isinstance(raw, dict):
+        fail("top level must be an object")
+    unknown = set(raw) - {"version", "title", "questions", "actions", "rules", "labels"}
+    if unknown:
+        fail(f"unknown keys {sorted(unknown)}")
+    version = raw.get("version")
+    if not isinstance(version, str) or not version:
+        fail("'version' must be a non-empty string")
+
+    questions = raw.get("questions")
+    if not isinstance(questions, list) or not questions:
+        fail("'questions' must be a non-empty list")
+    index, compiled_q, show_if = {}, [], []
+    for i, q in enumerate(questions):
+        if not isinstance(q, dict) or not isinstance(q.get("id"), str) or not q["id"]:
+            fail(f"question {i} needs a string 'id'")
+        qid = q["id"]
+        if qid in index:
+            fail(f"question '{qid}' is defined twice")
+        unknown = set(q) - {"id", "text", "type", "opts", "show_if"}
+        if unknown:
+            fail(f"question '{qid}': unknown keys {sorted(unknown)}")
+        if not isinstance(q.get("text"), str) or not q["text"]:
+            fail(f"question '{qid}' needs a 'text'")
+        if q.get("type") not in QUESTION_TYPES:
+            fail(f"question '{qid}': 'type' must be one of {QUESTION_TYPES}")
+        opts = q.get("opts")
+        if (not isinstance(opts, list) or not 2 <= len(opts) <= MAX_OPTS
+                or not all(isinstance(o, str) and o for o in opts) or len(set(opts)) != len(opts)):
+            fail(f"question '{qid}': 'opts' must be 2 to {MAX_OPTS} distinct strings")
+        cond = q.get("show_if") or {}
+        if not isinstance(cond, dict):
+            fail(f"question '{qid}': 'show_if' must be an object")
+        deps = []
+        for parent, value in cond.items():
+            if parent not in index:
+                fail(f"question '{qid}': show_if refers to '{parent}', which is not an earlier question")
+            parent_opts = compiled_q[index[parent]]["opts"]
+            if value not in parent_opts:
+                fail(f"question '{qid}': show_if value {value!r} is not an option of '{parent}'")
+            deps.append((index[parent], parent_opts.index(value) + 1))
+        entry = {"id": qid, "text": q["text"], "type": q["type"], "opts": list(opts)}
+        if cond:
+            entry["show_if"] = dict(cond)
+        index[qid] = i
+        compiled_q.append(entry)
+        show_if.append(tuple(deps))
+
+    actions = raw.get("actions")
+    if (not isinstance(actions, dict) or not actions
+            or not all(isinstance(t, str) and t for t in actions.values())):
+        fail("'actions' must map action ids to non-empty text")
+    action_index = {a: i for i, a in enumerate(actions)}
+
+    def allowed_codes(where, qid, value):
+        if qid not in index:
+            fail(f"{where}: unknown question '{qid}'")
+        opts = compiled_q[index[qid]]["opts"]
+        negate = isinstance(value, dict)
+        if negate:
+            if set(value) != {"not"}:
+                fail(f"{where}: condition objects only support 'not'")
+            value = value["not"]
+        values = [value] if isinstance(value, str) else value
+        if not isinstance(values, list) or not values or any(v not in opts for v in values):
+            fail(f"{where}: {value!r} is not an option of '{qid}'")
+        codes = {opts.index(v) + 1 for v in values}
+        if negate:
+            codes = set(range(len(opts) + 1)) - codes
+        return frozenset(codes)
+
+    rules = raw.get("rules")
+    if not isinstance(rules, list):
+        fail("'rules' must be a list")
+    compiled_r, rule_ids = [], set()
+    for i, r in enumerate(rules):
+        if not isinstance(r, dict) or not isinstance(r.get("id"), str) or not r["id"]:
+            fail(f"rule {i} needs a string 'id'")
+        where = f"rule '{r['id']}'"
+        if r["id"] in rule_ids:
+            fail(f"{where} is defined twice")
+        rule_ids.add(r["id"])
+        unknown = set(r) - {"id", "when", "probate", "dispute", "actions"}
+        if unknown:
+            fail(f"{where}: unknown keys {sorted(unknown)}")
+        when = r.get("when")
+        if not isinstance(when, dict) or not when:
+            fail(f"{where} needs a non-empty 'when'")
+        conds = []
+        for qid, value in when.items():
+            allowed = allowed_codes(where, qid, value)
+            conds.append((index[qid], allowed))
+        weights = []
+        for key in ("probate", "dispute"):
+            w = r.get(key, 0)
+            if not isinstance(w, int) or isinstance(w, bool) or w < 0:
+                fail(f"{where}: '{key}' must be a non-negative integer")
+            weights.append(w)
+        acts = r.get("actions", [])
+        if not isinstance(acts, list) or any(a not in action_index for a in acts):
+            fail(f"{where}: 'actions' must list known action ids")
+        compiled_r.append((r["id"], tuple(conds), weights[0], weights[1], tuple(action_index[a] for a in acts)))
+
+    labels = raw.get("labels")
+    if not isinstance(labels, dict) or set(labels) != {"probate", "dispute"}:
+        fail("'labels' must define 'probate' and 'dispute' bands")
+    compiled_l = {}
+    for kind, bands in labels.items():
+        if not isinstance(bands, list) or not bands:
+            fail(f"labels '{kind}' must be a non-empty list")
+        out, last = [], -1
+        for n, band in enumerate(bands):
+            final = n == len(bands) - 1
+            if not isinstance(band, dict) or not isinstance(band.get("label"), str) or band.get("pill") not in PILLS:
+                fail(f"labels '{kind}': each band needs a 'label' and a 'pill' from {PILLS}")
+            mx = band.get("max")
+            if final and mx is not None:
+                fail(f"labels '{kind}': the last band must not set 'max'")
+            if not final and (not isinstance(mx, int) or isinstance(mx, bool) or mx <= last):
+                fail(f"labels '{kind}': 'max' must be increasing integers")
+            out.append((mx, band["label"], band["pill"]))
+            last = mx
+        compiled_l[kind] = tuple(out)
+
+    return {
+        "format": FORMAT,
+        "version": version,
+        "title": raw.get("title") or "",
+        "questions": compiled_q,
+        "show_if": tuple(show_if),
+        "actions": tuple(actions.items()),
+        "rules": tuple(compiled_r),
+        "labels": compiled_l,
+    }
+
+
+class Questionnaire:
+    """A compiled questionnaire version, shared read-only by every session."""
+
+    def __init__(self, compiled, digest):
+        self.digest = digest
+        self.version = compiled["version"]
+        self.title = compiled["title"]
+        self.questions = tuple(_frozen(q) for q in compiled["questions"])
+        self.index = {q["id"]: i for i, q in enumerate(self.questions)}
+        self.show_if = compiled["show_if"]
+        # question index -> questions whose show_if reads it
+        self.children = tuple(tuple(j for j, deps in enumerate(self.show_if) if any(p == i for p, _ in deps))
+                              for i in range(len(self.questions)))
+        self.codes = tuple({o: c for c, o in enumerate(q["opts"], start=1)} for q in self.questions)
+        self.action_ids = tuple(a for a, _ in compiled["actions"])
+        self.action_text = tuple(t for _, t in compiled["actions"])
+        self.rules = compiled["rules"]
+        self.weights = {}  # overrides applied by with_weights
+        self.labels = compiled["labels"]
+        # question index -> indexes of the rules that read it
+        self.dependents = tuple(tuple(n for n, r in enumerate(self.rules) if any(qi == i for qi, _ in r[1]))
+                                for i in range(len(self.questions)))
+        self._reset_outcomes()
+
+    def _reset_outcomes(self):
+        self._table = None
+        self._groups = None
+        self._results = {}
+
+    def __repr__(self):
+        return f"<Questionnaire {self.version} ({self.digest[:12]})>"
+
+    def with_weights(self, weights):
+        """Copy sharing everything but the rule weights.
+
+        ``weights`` maps rule ids to ``{"probate": n, "dispute": n}``; rules not
+        listed, and keys left out, keep the definition's weights.
+        """
+        known = {r[0] for r in self.rules}
+        for rid, w in weights.items():
+            if rid not in known:
+                raise DefinitionError(f"weights: unknown rule '{rid}'")
+            if not isinstance(w, dict) or set(w) - {"probate", "dispute"} or not all(
+                    isinstance(n, int) and not isinstance(n, bool) and n >= 0 for n in w.values()):
+                raise DefinitionError(f"weights: rule '{rid}' needs non-negative 'probate'/'dispute' integers")
+        derived = copy.copy(self)
+        derived.weights = dict(weights)
+        derived.rules = tuple(
+            (rid, conds, weights.get(rid, {}).get("probate", p), weights.get(rid, {}).get("dispute", d), acts)
+            for rid, conds, p, d, acts in self.rules)
+        derived.digest = hashlib.sha256(
+            f"{self.digest}:{json.dumps(weights, sort_keys=True)}".encode()).hexdigest()
+        derived._reset_outcomes()
+        return derived
+
+    def encode(self, answers):
+        """Answer dict -> one code per question (0 = unanswered, n = opts[n-1]).
+
+        Answers to questions their ``show_if`` hides are left out.
+        """
+        state = getattr(answers, "codes", None)
+        if state is not None and answers.qn.questions is self.questions:
+            return bytes(state)  # AnswerState keeps itself pruned
+        codes = bytearray(len(self.questions))
+        for i, q in enumerate(self.questions):
+            value = answers.get(q["id"])
+            if value is not None:
+                codes[i] = self.codes[i].get(value, 0)
+        self.prune(codes)
+        return bytes(codes)
+
+    def prune(self, codes, changed=None):
+        """Blank answers hidden by ``show_if``, in place; returns the cleared question indexes.
+
+        With ``changed`` only that question's descendants are checked, which is
+        all that can go stale when one answer moves.
+        """
+        cleared = []
+        if changed is None:
+            for i, deps in enumerate(self.show_if):  # parents come first, so one pass will do
+                if deps and codes[i] and not self.visible(i, codes):
+                    codes[i] = 0
+                    cleared.append(i)
+            return cleared
+        stack = list(self.children[changed])
+        while stack:
+            i = stack.pop()
+            if codes[i] and not self.visible(i, codes):
+                codes[i] = 0
+                cleared.append(i)
+                stack.extend(self.children[i])
+        return cleared
+
+    def decode(self, codes):
+        return {q["id"]: q["opts"][c - 1] for q, c in zip(self.questions, codes) if c}
+
+    def visible(self, i, codes):
+        return all(codes[p] == c for p, c in self.show_if[i])
+
+    def label(self, kind, score):
+        for mx, label, pill in self.labels[kind]:
+            if mx is None or score <= mx:
+                return label, pill
+
+    def score(self, answers):
+        return self.score_codes(self.encode(answers))
+
+    def fired(self, codes):
+        """Bit mask of the rules whose conditions ``codes`` meet (bit n = ``rules[n]``)."""
+        mask = 0
+        for n, (_, conds, _, _, _) in enumerate(self.rules):
+            for qi, allowed in conds:
+                if codes[qi] not in allowed:
+                    break
+            else:
+                mask |= 1 << n
+        return mask
+
+    def refire(self, codes, mask, changed):
+        """Update a ``fired`` mask after question ``changed`` moved, re-testing only the rules that read it."""
+        for n in self.dependents[changed]:
+            for qi, allowed in self.rules[n][1]:
+                if codes[qi] not in allowed:
+                    mask &= ~(1 << n)
+                    break
+            else:
+                mask |= 1 << n
+        return mask
+
+    def result_for(self, mask):
+        """The Result for a fired-rule mask (see ``fired`` and ``refire``)."""
+        n = len(self.rules)
+        probate = dispute = 0
+        for i, (_, _, p, d, _) in enumerate(self.rules):
+            if mask >> i & 1:
+                probate += p
+                dispute += d
+        if (probate | dispute) >> WEIGHT_BITS:
+            return self._result(mask, probate, dispute)
+        return self._cached(mask + (probate << n) + (dispute << (n + WEIGHT_BITS)))
+
+    def score_rules(self, codes):
+        """Score by walking the rule chain; the reference for the outcome table."""
+        mask = self.fired(codes)
+        rules = [r for n, r in enumerate(self.rules) if mask >> n & 1]
+        return self._result(mask, sum(r[2] for r in rules), sum(r[3] for r in rules))
+
+    def score_codes(self, codes):
+        table = self._table
+        if table is None:
+            table = self._table = self._build_table()
+        if not table:
+            return self.score_rules(codes)
+        codes = bytes(codes)
+        total = 0
+        for start, end, entries in table:
+            total += entries[codes[start:end]]
+        return self._cached(total)
+
+    def _cached(self, total):
+        # ``total`` packs the fired-rule bits and both sums, as in the outcome table.
+        result = self._results.get(total)
+        if result is None:
+            n = len(self.rules)
+            if len(self._results) >= 4096:
+                self._results.clear()
+            result = self._results[total] = self._result(
+                total & ((1 << n) - 1), total >> n & ((1 << WEIGHT_BITS) - 1), total >> (n + WEIGHT_BITS))
+        return result
+
+    def _result(self, mask, probate, dispute):
+        picked = []
+        for n, (_, _, _, _, acts) in enumerate(self.rules):
+            if mask >> n & 1:
+                for a in acts:
+                    if a not in picked:
+                        picked.append(a)
+        probate_label, probate_pill = self.label("probate", probate)
+        dispute_label, dispute_pill = self.label("dispute", dispute)
+        return Result(probate, dispute, probate_label, dispute_label, probate_pill, dispute_pill,
+                      tuple(self.action_text[a] for a in picked), tuple(self.action_ids[a] for a in picked))
+
+    def components(self):
+        """Group rules that share questions: ``[(question indexes, rule indexes)]``, in question order."""
+        groups = []
+        for n, (_, conds, _, _, _) in enumerate(self.rules):
+            qs, rs = {qi for qi, _ in conds}, {n}
+            for g in [g for g in groups if g[0] & qs]:
+                groups.remove(g)
+                qs |= g[0]
+                rs |= g[1]
+            groups.append((qs, rs))
+        return sorted((tuple(sorted(qs)), tuple(sorted(rs))) for qs, rs in groups)
+
+    def groups(self):
+        """Questions tied together by a rule or a ``show_if`` link, with every way to finish them.
+
+        Returns ``[(question indexes, rule mask, [(codes, probate, dispute, fired mask), ...])]``
+        where ``codes`` covers the group's questions only and "finished" means
+        every visible question answered and every hidden one blank.
+        """
+        if self._groups is None:
+            parent = list(range(len(self.questions)))
+
+            def find(i):
+                while parent[i] != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            links = [[qi for qi, _ in conds] for _, conds, _, _, _ in self.rules]
+            links += [[i] + [p for p, _ in deps] for i, deps in enumerate(self.show_if)]
+            for qs in links:
+                for q in qs[1:]:
+                    parent[find(q)] = find(qs[0])
+            members = {}
+            for i in range(len(self.questions)):
+                members.setdefault(find(i), []).append(i)
+            self._groups = [self._finishes(qs) for qs in members.values()]
+        return self._groups
+
+    def _finishes(self, qs):
+        size = 1
+        for i in qs:
+            size *= len(self.questions[i]["opts"]) + 1
+        if size > 1 << 20:
+            raise DefinitionError(f"questions {[self.questions[i]['id'] for i in qs]} are too entangled to enumerate")
+        rules = 0
+        for n, (_, conds, _, _, _) in enumerate(self.rules):
+            if conds[0][0] in qs:
+                rules |= 1 << n
+        codes = bytearray(len(self.questions))
+        finishes = []
+        for combo in itertools.product(*(range(len(self.questions[i]["opts"]) + 1) for i in qs)):
+            for i, c in zip(qs, combo):
+                codes[i] = c
+            if all(bool(codes[i]) == self.visible(i, codes) for i in qs):
+                mask = self.fired(codes) & rules
+                fired = [r for n, r in enumerate(self.rules) if mask >> n & 1]
+                finishes.append((combo, sum(r[2] for r in fired), sum(r[3] for r in fired), mask))
+        return tuple(qs), rules, finishes
+
+    def outlook(self, codes):
+        """Score bounds over every way to finish from ``codes``, and the most decisive question to ask next.
+
+        Labels are settled when both bounds fall in the same band; actions when
+        no remaining answer can change which rules fire. The next question is
+        the first askable one in the group whose answers still move the scores
+        the most, preferring groups that can still change the actions.
+        """
+        plo = phi = dlo = dhi = 0
+        actions_settled, best = True, None
+        for qs, rules, finishes in self.groups():
+            live = [f for f in finishes if all(codes[q] == c for q, c in zip(qs, f[0]) if codes[q])]
+            if not live:  # answers no respondent could finish with (e.g. hand-built); take them as they are
+                mask = self.fired(codes) & rules
+                fired = [r for n, r in enumerate(self.rules) if mask >> n & 1]
+                live = [(None, sum(r[2] for r in fired), sum(r[3] for r in fired), mask)]
+            ps, ds = [f[1] for f in live], [f[2] for f in live]
+            plo, phi, dlo, dhi = plo + min(ps), phi + max(ps), dlo + min(ds), dhi + max(ds)
+            open_actions = len({f[3] for f in live}) > 1
+            actions_settled = actions_settled and not open_actions
+            ask = next((q for q in qs if not codes[q] and self.visible(q, codes)), None)
+            if ask is not None:
+                key = (-(max(ps) - min(ps) + max(ds) - min(ds)), not open_actions, ask)
+                best = min(best, key) if best else key
+        labels_settled = (self.label("probate", plo) == self.label("probate", phi)
+                          and self.label("dispute", dlo) == self.label("dispute", dhi))
+        return Outlook((plo, phi), (dlo, dhi), labels_settled, actions_settled, best[2] if best else None)
+
+    def _build_table(self):
+        # The outcome table: rules only interact through the answers they
+        # share, so each group of rules is enumerated over just its own
+        # questions. Groups are packed into contiguous blocks of questions, and
+        # every block maps its slice of the answer codes to one integer holding
+        # the fired-rule bits and the probate and dispute sums. Scoring is then
+        # a handful of dict lookups added together, whatever the number of rules.
+        n = len(self.rules)
+        if sum(max(p, d) for _, _, p, d, _ in self.rules) >> WEIGHT_BITS:
+            return ()
+        spans = []
+        for qs, rs in self.components():
+            if spans and qs[0] <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], qs[-1]), spans[-1][2] + rs)
+            else:
+                spans.append((qs[0], qs[-1], rs))
+        blocks = []
+        for start, end, rs in spans:
+            if end - start >= MAX_BLOCK:
+                return ()  # too wide to enumerate; score_codes falls back to the rule chain
+            if blocks and end - blocks[-1][0] < MAX_BLOCK:
+                blocks[-1] = (blocks[-1][0], end, blocks[-1][2] + rs)
+            else:
+                blocks.append((start, end, rs))
+        table = []
+        for start, end, rs in blocks:
+            entries = {}
+            radices = [range(len(self.questions[i]["opts"]) + 1) for i in range(start, end + 1)]
+            for combo in itertools.product(*radices):
+                total = 0
+                for r in rs:
+                    _, conds, p, d, _ = self.rules[r]
+                    if all(combo[qi - start] in allowed for qi, allowed in conds):
+                        total += (1 << r) + (p << n) + (d << (n + WEIGHT_BITS))
+                entries[bytes(combo)] = total
+            table.append((start, end + 1, entries))
+        return tuple(table)
+
+
+def _frozen(q):
+    q = dict(q, opts=tuple(q["opts"]))
+    if "show_if" in q:
+        q["show_if"] = MappingProxyType(q["show_if"])
+    return MappingProxyType(q)
+
+
+_loaded = {}  # resolved path -> ((mtime_ns, size), Questionnaire)
+_lock = threading.Lock()
+
+
+def _version_key(version):
+    return tuple(int(p) if p.isdigit() else p for p in version.split("."))
+
+
+def versions():
+    return sorted((p.stem for p in DATA_DIR.glob("*.json")), key=_version_key)
+
+
+def load(version=DEFAULT_VERSION):
+    path = DATA_DIR / f"{version}.json"
+    if path.parent != DATA_DIR or not path.is_file():
+        raise LookupError(f"unknown questionnaire version: {version!r}")
+    return load_file(path)
+
+
+def load_file(path):
+    """Return the compiled questionnaire for ``path``, recompiling only if the file changed."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    entry = _loaded.get(path)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    with _lock:
+        entry = _loaded.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry[1].digest == digest:
+            qn = entry[1]
+        else:
+            try:
+                qn = Questionnaire(_compiled(path, data, digest), digest)
+            except DefinitionError as e:
+                if entry is None:
+                    raise
+                log.warning("%s; still serving the previously loaded version", e)
+                qn = entry[1]
+        _loaded[path] = (stamp, qn)
+        return qn
+
+
+def _compiled(path, data, digest):
+    cache_dir = path.parent / "__pycache__"
+    cache = cache_dir / f"{path.stem}.{digest[:16]}.{sys.implementation.cache_tag}.marshal"
+    try:
+        fmt, cached_digest, compiled = marshal.loads(cache.read_bytes())
+        if fmt == FORMAT and cached_digest == digest:
+            return compiled
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+    try:
+        raw = json.loads(data)
+    except ValueError as e:
+        raise DefinitionError(f"{path.name}: {e}") from None
+    compiled = compile_definition(raw, path.name)
+    try:
+        cache_dir.mkdir(exist_ok=True)
+        tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(marshal.dumps((FORMAT, digest, compiled)))
+        os.replace(tmp, cache)
+        for stale in cache_dir.glob(f"{path.stem}.*.marshal"):
+            if stale != cache:
+                stale.unlink(missing_ok=True)
+    except OSError:
+        pass  # read-only checkout: compile in memory on each start instead
+    return compiled
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Validate and compile questionnaire definitions.")
+    parser.add_argument("versions", nargs="*", help="versions to check (default: all)")
+    args = parser.parse_args(argv)
+    status = 0
+    for version in args.versions or versions():
+        try:
+            qn = load(version)
+        except (LookupError, DefinitionError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        print(f"{version}: {len(qn.questions)} questions, {len(qn.rules)} rules, "
+              f"{len(qn.action_ids)} actions ({qn.digest[:12]})")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
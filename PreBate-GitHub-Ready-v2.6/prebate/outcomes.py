@@ -0,0 +1,145 @@
+"""Stored outcome tables: an exhaustive regression oracle for rule changes.
+
+Rules only interact through the questions they share, so the answer space
+splits into small groups of questions (see ``Questionnaire.components``).
+``questionnaires/outcomes/<version>.json`` records, for every group, each
+combination of its answers that fires anything, with the resulting scores and
+rules. Checking a definition against its stored table enumerates every
+combination of every group (old and new) and reports each one that now scores
+differently:
+
+    python -m prebate.outcomes            # check all versions, exit 1 on a difference
+    python -m prebate.outcomes 2.6 --write  # accept the current rules as the new oracle
+"""
+
+import argparse
+import itertools
+import json
+import sys
+
+from prebate import engine
+
+OUTCOME_DIR = engine.DATA_DIR / "outcomes"
+UNANSWERED = "-"
+
+
+def _key(qn, qs, codes):
+    return ",".join(qn.questions[i]["opts"][codes[i] - 1] if codes[i] else UNANSWERED for i in qs)
+
+
+def _combos(qn, qs):
+    """Every code vector that varies only the questions ``qs`` (everything else unanswered)."""
+    codes = bytearray(len(qn.questions))
+    for combo in itertools.product(*(range(len(qn.questions[i]["opts"]) + 1) for i in qs)):
+        for i, c in zip(qs, combo):
+            codes[i] = c
+        yield bytes(codes)
+
+
+def _outcome(qn, codes):
+    mask = qn.fired(codes)
+    fired = [r for n, r in enumerate(qn.rules) if mask >> n & 1]
+    return sum(r[2] for r in fired), sum(r[3] for r in fired), sorted(r[0] for r in fired)
+
+
+def table(qn):
+    """The oracle for ``qn`` as a JSON-ready dict."""
+    components = []
+    for qs, _ in qn.components():
+        outcomes = {}
+        for codes in _combos(qn, qs):
+            probate, dispute, rules = _outcome(qn, codes)
+            if rules:
+                outcomes[_key(qn, qs, codes)] = {"probate": probate, "dispute": dispute, "rules": rules}
+        components.append({"questions": [qn.questions[i]["id"] for i in qs], "outcomes": outcomes})
+    return {"version": qn.version, "components": components}
+
+
+def path(version):
+    return OUTCOME_DIR / f"{version}.json"
+
+
+def write(qn):
+    # One line per outcome, so a rule change shows up as a readable diff.
+    def dump(v):
+        return json.dumps(v, ensure_ascii=False)
+
+    data = table(qn)
+    comps = []
+    for comp in data["components"]:
+        rows = ",\n".join(f"    {dump(k)}: {dump(v)}" for k, v in comp["outcomes"].items())
+        comps.append(f'  {{"questions": {dump(comp["questions"])}, "outcomes": {{\n{rows}\n  }}}}')
+    OUTCOME_DIR.mkdir(exist_ok=True)
+    path(qn.version).write_text(f'{{"version": {dump(data["version"])}, "components": [\n'
+                                + ",\n".join(comps) + "\n]}\n", encoding="utf-8")
+
+
+def check(qn, stored):
+    """Compare ``qn`` with a stored oracle; returns a list of human-readable differences."""
+    groups = []
+    for comp in stored["components"]:
+        missing = [q for q in comp["questions"] if q not in qn.index]
+        if missing:
+            return [f"questions {missing} no longer exist; rewrite the oracle with --write"]
+        groups.append(([qn.index[q] for q in comp["questions"]], comp["outcomes"]))
+
+    def expected(codes):
+        probate = dispute = 0
+        rules = []
+        for qs, outcomes in groups:
+            hit = outcomes.get(_key(qn, qs, codes))
+            if hit:
+                probate += hit["probate"]
+                dispute += hit["dispute"]
+                rules += hit["rules"]
+        return probate, dispute, sorted(rules)
+
+    diffs, seen = [], set()
+    for qs in [qs for qs, _ in groups] + [qs for qs, _ in qn.components()]:
+        for codes in _combos(qn, qs):
+            if codes in seen:
+                continue
+            seen.add(codes)
+            was, now = expected(codes), _outcome(qn, codes)
+            if was != now:
+                answers = ", ".join(f"{qn.questions[i]['id']}={_key(qn, [i], codes)}" for i in qs)
+                diffs.append(f"{answers}: probate {was[0]} -> {now[0]}, dispute {was[1]} -> {now[1]}, "
+                             f"rules {was[2]} -> {now[2]}")
+    return diffs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check questionnaire rules against their stored outcome tables.")
+    parser.add_argument("versions", nargs="*", help="versions to check (default: all)")
+    parser.add_argument("--write", action="store_true", help="store the current outcomes as the new oracle")
+    args = parser.parse_args(argv)
+    status = 0
+    for version in args.versions or engine.versions():
+        try:
+            qn = engine.load(version)
+        except (LookupError, engine.DefinitionError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        if args.write:
+            write(qn)
+            print(f"{version}: wrote {path(version).relative_to(engine.DATA_DIR.parent)}")
+            continue
+        try:
+            stored = json.loads(path(version).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            print(f"{version}: no stored outcomes; create them with --write", file=sys.stderr)
+            status = 1
+            continue
+        diffs = check(qn, stored)
+        for d in diffs:
+            print(f"{version}: {d}")
+        if diffs:
+            status = 1
+        else:
+            print(f"{version}: ok ({sum(len(c['outcomes']) for c in stored['components'])} outcomes)")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
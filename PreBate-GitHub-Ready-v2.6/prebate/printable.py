@@ -0,0 +1,78 @@
+"""Self-contained HTML report, for clients who only need to print.
+
+The page is one precompiled ``string.Template`` using the same pill classes as
+the app. Pages are cached per tenant and answer codes (the scoring happens
+inside the cache too), so only the generation time is filled in per request.
+"""
+
+import functools
+import html
+import string
+from datetime import datetime
+
+_PAGE = string.Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>$title</title>
+<style>
+  body { font-family: Helvetica, Arial, sans-serif; color:#111827; max-width: 780px; margin: 2rem auto; padding: 0 1rem; line-height: 1.45; }
+  h1 { font-size: 1.6rem; font-weight: 400; color: $color; margin: 0 0 .75rem; }
+  h2 { font-size: 1.15rem; font-weight: 400; color: $color; margin: 1.5rem 0 .5rem; }
+  .meta { color:#475569; }
+  .pills { margin: 1rem 0; }
+  .pill { display:inline-block; padding: .35rem .75rem; border-radius:999px; font-weight:700; color:#fff; margin-right: .5rem; }
+  .pill-low { background:#16A34A; }
+  .pill-mod { background:#F59E0B; }
+  .pill-high { background:#DC2626; }
+  ol { padding-left: 1.4rem; }
+  li { margin: .2rem 0; }
+  footer { margin-top: 1.5rem; color:#475569; }
+  .print { margin-top: 2rem; padding: .5rem 1rem; border-radius: 8px; border: 1px solid #CBD5E1; background:#fff; cursor:pointer; }
+  @media print {
+    body { margin: 0; max-width: none; }
+    .pill { -webkit-print-color-adjust: exact; print-color-adjust: exact; }
+    .print { display:none; }
+  }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+<p class="meta">Generated: $generated</p>
+<div class="pills">
+  <span class="pill $probate_pill">Probate: $probate_label (score $probate_risk)</span>
+  <span class="pill $dispute_pill">Dispute: $dispute_label (score $dispute_risk)</span>
+</div>
+<h2>Recommended Actions</h2>
+$actions
+$footer
+<button class="print" onclick="window.print()">Print</button>
+</body>
+</html>
+""")
+_STAMP = "\x00"  # stands in for the generation time in cached pages
+
+
+@functools.lru_cache(maxsize=1024)
+def _page(tenant, codes):
+    result = tenant.questionnaire.score_codes(codes)
+    if result.actions:
+        actions = "<ol>\n" + "\n".join(f"  <li>{html.escape(a)}</li>" for a in result.actions) + "\n</ol>"
+    else:
+        actions = "<p>No immediate actions detected.</p>"
+    page = _PAGE.substitute(
+        title=html.escape(tenant.pdf_title), color=tenant.pdf_color, generated=_STAMP,
+        probate_pill=result.probate_pill, probate_label=html.escape(result.probate_label),
+        probate_risk=result.probate_risk, dispute_pill=result.dispute_pill,
+        dispute_label=html.escape(result.dispute_label), dispute_risk=result.dispute_risk,
+        actions=actions, footer=f"<footer>{html.escape(tenant.pdf_footer)}</footer>" if tenant.pdf_footer else "")
+    head, _, tail = page.partition(_STAMP)
+    return head, tail
+
+
+def build_html(tenant, answers, generated=None):
+    """Render the printable report for ``answers`` (a dict or AnswerState) as UTF-8 bytes."""
+    head, tail = _page(tenant, tenant.questionnaire.encode(answers))
+    generated = generated or datetime.now()
+    return (head + generated.strftime("%Y-%m-%d %H:%M") + tail).encode("utf-8")
@@ -0,0 +1,79 @@
+"""Offline-capable questionnaire (a progressive web app), served by ``prebate.serve``.
+
+    /pwa/            the default questionnaire
+    /pwa/<slug>/     a tenant's
+
+Each scope serves the page shell (``static/pwa/index.html``), a service
+worker, a web manifest, the logo and ``questions.json`` (questions, options
+and ``show_if`` only; rules and weights stay on the server). The service
+worker caches all of them, so repeat visits load from the device and the
+questionnaire runs without a connection. A finished answer set waits in the
+page's outbox until it can be posted to ``/api/submit``, which scores it and
+answers with the labels, actions, result token and PDF link.
+
+Files are built once per tenant; the service worker's version is a hash of
+everything it caches, so a changed questionnaire or logo reaches devices on
+their next visit online.
+"""
+
+import functools
+import hashlib
+import json
+from pathlib import Path
+
+STATIC = Path(__file__).resolve().parent / "static" / "pwa"
+TYPES = {
+    "index.html": "text/html; charset=utf-8",
+    "questions.json": "application/json",
+    "manifest.webmanifest": "application/manifest+json",
+    "logo.png": "image/png",
+    "sw.js": "text/javascript; charset=utf-8",
+}
+
+
+def questions(tenant):
+    """What the page needs to run ``tenant``'s questionnaire offline."""
+    qn = tenant.questionnaire
+    return {
+        "tenant": tenant.slug,
+        "version": qn.version,
+        "page_title": tenant.page_title,
+        "hero_title": tenant.hero_title,
+        "hero_subtitle": tenant.hero_subtitle,
+        "logo": bool(tenant.logo_path),
+        "questions": [{"id": q["id"], "text": q["text"], "opts": list(q["opts"]),
+                       **({"show_if": dict(q["show_if"])} if q.get("show_if") else {})} for q in qn.questions],
+    }
+
+
+def manifest(tenant):
+    return {
+        "name": tenant.page_title,
+        "short_name": tenant.name,
+        "start_url": "./",
+        "scope": "./",
+        "display": "standalone",
+        "background_color": "#FFFFFF",
+        "theme_color": tenant.pdf_color,
+        "icons": [{"src": "logo.png", "type": "image/png", "sizes": "any"}] if tenant.logo_path else [],
+    }
+
+
+@functools.lru_cache(maxsize=64)
+def files(tenant):
+    """``{name: (content type, bytes)}`` for one scope."""
+    out = {
+        "index.html": (STATIC / "index.html").read_bytes(),
+        "questions.json": json.dumps(questions(tenant), ensure_ascii=False).encode(),
+        "manifest.webmanifest": json.dumps(manifest(tenant), ensure_ascii=False).encode(),
+    }
+    if tenant.logo_path:
+        out["logo.png"] = Path(tenant.logo_path).read_bytes()
+    digest = hashlib.sha256()
+    for name in sorted(out):
+        digest.update(name.encode() + b"\0" + out[name] + b"\0")
+    shell = ["./"] + sorted(n for n in out if n != "index.html")
+    out["sw.js"] = ((STATIC / "sw.js").read_text(encoding="utf-8")
+                    .replace("__VERSION__", digest.hexdigest()[:16])
+                    .replace("__SHELL__", json.dumps(shell)).encode())
+    return {name: (TYPES[name], data) for name, data in out.items()}
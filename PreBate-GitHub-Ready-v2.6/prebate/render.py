@@ -0,0 +1,87 @@
+"""Admission control for report rendering.
+
+Reports are rendered on a small process-wide thread pool instead of in the
+script thread of whoever opened the results page, so a burst of results pages
+(a mailing campaign) queues PDFs rather than stalling everyone's answer
+clicks. At most ``PREBATE_RENDER_CONCURRENCY`` reports render at once and at
+most ``PREBATE_RENDER_QUEUE`` more wait; beyond that ``submit`` refuses with
+``Overloaded``. A job that waited longer than ``PREBATE_RENDER_TIMEOUT``
+seconds is dropped unrendered, and its page offers to try again.
+Submitting a key that is already admitted returns the same job, so reruns
+and reloads of one results page never render twice.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CONCURRENCY_ENV = "PREBATE_RENDER_CONCURRENCY"
+QUEUE_ENV = "PREBATE_RENDER_QUEUE"
+TIMEOUT_ENV = "PREBATE_RENDER_TIMEOUT"
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+class Overloaded(RuntimeError):
+    pass
+
+
+class Renderer:
+    def __init__(self, concurrency=2, queue=32, timeout=20.0):
+        if concurrency < 1 or queue < 0 or timeout <= 0:
+            raise ValueError("concurrency must be >= 1, queue >= 0 and timeout > 0")
+        self.concurrency, self.queue, self.timeout = concurrency, queue, timeout
+        self._pool = ThreadPoolExecutor(concurrency, thread_name_prefix="prebate-render")
+        self._jobs = {}  # key -> Future, while admitted (queued or rendering)
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Admit ``fn(*args, **kwargs)`` under ``key`` and return its Future, or raise ``Overloaded``."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job
+            if len(self._jobs) >= self.concurrency + self.queue:
+                raise Overloaded(f"{len(self._jobs)} reports are already rendering or waiting")
+            job = self._pool.submit(self._run, time.monotonic(), fn, args, kwargs)
+            self._jobs[key] = job
+        job.add_done_callback(lambda _: self._release(key))
+        return job
+
+    def pending(self):
+        """Reports admitted but not finished."""
+        return len(self._jobs)
+
+    def _run(self, admitted, fn, args, kwargs):
+        waited = time.monotonic() - admitted
+        if waited > self.timeout:
+            raise TimeoutError(f"dropped after waiting {waited:.1f}s for a render slot")
+        return fn(*args, **kwargs)
+
+    def _release(self, key):
+        with self._lock:
+            self._jobs.pop(key, None)
+
+
+def _env(name, default, kind):
+    value = os.environ.get(name)
+    try:
+        return kind(value) if value else default
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}") from None
+
+
+def renderer():
+    """The process-wide renderer, configured from the environment on first use."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = Renderer(_env(CONCURRENCY_ENV, 2, int), _env(QUEUE_ENV, 32, int),
+                                 _env(TIMEOUT_ENV, 20.0, float))
+        return _renderer
+
+
+def submit(key, fn, *args, **kwargs):
+    return renderer().submit(key, fn, *args, **kwargs)
@@ -0,0 +1,359 @@
+"""PDF report rendering (ReportLab is imported lazily, on first render).
+
+Reports are one page in the common case, so ``write_pdf`` first tries a
+template renderer that draws straight onto a canvas at positions matching the
+Platypus layout; anything that would not fit on the page (or carries markup)
+falls back to the full ``SimpleDocTemplate`` story.
+
+``generated`` is the time printed on a report: a datetime, a date (printed
+without a time), None for now, or False to leave the line out. With
+``invariant=True`` ReportLab writes a fixed creation date and a document ID
+derived from the content, so the same report with the same ``generated`` is
+the same bytes every time (see ``etag``).
+
+Size: page streams are compressed unless ``compress=False``, and left
+binary rather than ASCII85 encoded (a process-wide ReportLab setting, made
+once on the first render); a tenant's ``pdf.fonts`` picks the PDF base fonts
+(nothing embedded, the default) or a subset-embedded TrueType font for text
+beyond Latin-1, and ``pdf.logo`` adds the logo, downscaled and stored as a
+JPEG.
+"""
+
+import functools
+import hashlib
+import html
+import io
+import logging
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+# Geometry of the Platypus layout below: A4, 36pt margins plus the frame's 6pt padding.
+PAGE_W, PAGE_H = 595.2755905511812, 841.8897637795277
+LEFT, TOP, BOTTOM = 42, PAGE_H - 42, 42
+WIDTH = PAGE_W - 84
+INDENT = 18  # ListFlowable's default left indent for the numbered actions
+BODY_COLOR = "#111827"
+FONTS = {  # pdf.fonts -> (regular, bold)
+    "standard": ("Helvetica", "Helvetica-Bold"),  # PDF base fonts, never embedded
+    "subset": ("PreBateSans", "PreBateSans-Bold"),  # Bitstream Vera (ships with ReportLab), used glyphs only
+}
+LOGO_HEIGHT = 36  # points
+LOGO_DPI = 150
+LOGO_QUALITY = 80
+
+
+@functools.lru_cache(maxsize=None)
+def _setup():
+    # Process-wide ReportLab settings, made once before the first render
+    # (at import they would pull ReportLab in with this module).
+    from reportlab import rl_config
+    rl_config.useA85 = 0  # streams stay binary: ASCII85 text costs a quarter more bytes and is slow to encode
+
+
+@functools.lru_cache(maxsize=None)
+def _fonts(kind):
+    regular, bold = FONTS[kind]
+    if kind == "subset":
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+        pdfmetrics.registerFont(TTFont(regular, "Vera.ttf"))
+        pdfmetrics.registerFont(TTFont(bold, "VeraBd.ttf"))
+        pdfmetrics.registerFontFamily(regular, normal=regular, bold=bold, italic=regular, boldItalic=bold)
+    return regular, bold
+
+
+@functools.lru_cache(maxsize=16)
+def _logo(path):
+    # (JPEG bytes, width, height): scaled to LOGO_HEIGHT at LOGO_DPI, flattened onto white.
+    from PIL import Image
+    try:
+        with Image.open(path) as im:
+            im = im.convert("RGBA")
+            width = min(LOGO_HEIGHT * im.width / im.height, WIDTH)
+            height = width * im.height / im.width
+            im = im.resize((max(1, round(width * LOGO_DPI / 72)), max(1, round(height * LOGO_DPI / 72))),
+                           Image.LANCZOS)
+    except OSError as e:
+        log.warning("PDF logo %s left out: %s", path, e)
+        return None
+    flat = Image.new("RGB", im.size, "white")
+    flat.paste(im, mask=im.getchannel("A"))
+    out = io.BytesIO()
+    flat.save(out, "JPEG", quality=LOGO_QUALITY, optimize=True)
+    return out.getvalue(), width, height
+
+
+def _tenant_logo(tenant):
+    return _logo(tenant.logo_path) if tenant.pdf_logo and tenant.logo_path else None
+
+
+@functools.lru_cache(maxsize=None)
+def _body_style(font="Helvetica"):
+    # Shared by every tenant, so it doubles as a stable key for the layout caches below.
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib import colors
+    return ParagraphStyle(name="BodyPB", fontName=font, fontSize=11, leading=16, textColor=colors.HexColor(BODY_COLOR))
+
+
+def _styles(tenant):
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    regular, _ = _fonts(tenant.pdf_fonts)
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name="TitlePB", fontName=regular, fontSize=18, leading=22, textColor=colors.HexColor(tenant.pdf_color), spaceAfter=12))
+    styles.add(ParagraphStyle(name="H2PB", fontName=regular, fontSize=13, leading=16, textColor=colors.HexColor(tenant.pdf_color), spaceAfter=6))
+    styles.add(_body_style(regular))
+    return styles
+
+
+# Action texts come from a small fixed catalogue, so their markup is parsed and
+# their lines wrapped once per process and reused by every report.
+
+@functools.lru_cache(maxsize=512)
+def _frags(text, style):
+    from reportlab.platypus import Paragraph
+    return Paragraph(text, style).frags
+
+
+def action_paragraph(text, style):
+    """A fresh Paragraph for ``text`` that reuses the cached parse (wrapping state stays per report)."""
+    from reportlab.platypus import Paragraph
+    return Paragraph(text, style, frags=_frags(text, style))
+
+
+@functools.lru_cache(maxsize=512)
+def _lines(text, font, size, width):
+    from reportlab.lib.utils import simpleSplit
+    return tuple(simpleSplit(text, font, size, width))
+
+
+def _stamp(generated):
+    if generated is False:
+        return None
+    generated = generated or datetime.now()
+    if not isinstance(generated, datetime):  # a date: the day only
+        return f"Generated: {generated.strftime('%Y-%m-%d')}"
+    return f"Generated: {generated.strftime('%Y-%m-%d %H:%M')}"
+
+
+def story(tenant, result, generated=None, client=None, styles=None):
+    from reportlab.platypus import Image, Paragraph, Spacer, ListFlowable, ListItem
+    styles = styles or _styles(tenant)
+    stamp = _stamp(generated)
+    flow = []
+    logo = _tenant_logo(tenant)
+    if logo:
+        flow += [Image(io.BytesIO(logo[0]), width=logo[1], height=logo[2], hAlign="LEFT"), Spacer(1, 10)]
+    flow.append(Paragraph(html.escape(tenant.pdf_title), styles["TitlePB"]))
+    if client:
+        flow.append(Paragraph(f"<b>Prepared for:</b> {html.escape(client)}", styles["BodyPB"]))
+    if stamp:
+        flow.append(Paragraph(stamp, styles["BodyPB"]))
+    flow += [Spacer(1, 8),
+             Paragraph(f"<b>Probate Risk:</b> {result.probate_label} (score {result.probate_risk})", styles["BodyPB"]),
+             Paragraph(f"<b>Dispute Risk:</b> {result.dispute_label} (score {result.dispute_risk})", styles["BodyPB"]),
+             Spacer(1, 10),
+             Paragraph("Recommended Actions", styles["H2PB"])]
+    if result.actions:
+        items = [ListItem(action_paragraph(x, styles["BodyPB"])) for x in result.actions]
+        flow.append(ListFlowable(items, bulletType='1', start='1', bulletFontName=_fonts(tenant.pdf_fonts)[0]))
+    else:
+        flow.append(Paragraph("No immediate actions detected.", styles["BodyPB"]))
+    if tenant.pdf_footer:
+        flow += [Spacer(1, 14), Paragraph(html.escape(tenant.pdf_footer), styles["BodyPB"])]
+    return flow
+
+
+def _doc(fp, invariant=False, compress=True):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+    return SimpleDocTemplate(fp, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36,
+                             invariant=1 if invariant else None, pageCompression=1 if compress else 0)
+
+
+class _Capture:
+    # ReportLab assembles the whole document and hands it to write() in one
+    # call; keeping that bytes object (instead of copying it into a BytesIO
+    # and out again with getvalue()) leaves a single buffer per report.
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return self.parts[0] if len(self.parts) == 1 else b"".join(self.parts)
+
+
+@functools.lru_cache(maxsize=64)
+def _template(tenant):
+    # The static part of the page, laid out once per tenant.
+    from reportlab.lib import colors
+    regular, bold = _fonts(tenant.pdf_fonts)
+    title = _lines(tenant.pdf_title, regular, 18, WIDTH)
+    footer = _lines(tenant.pdf_footer, regular, 11, WIDTH) if tenant.pdf_footer else ()
+    return (title, footer, colors.HexColor(tenant.pdf_color), colors.HexColor(BODY_COLOR), colors.black,
+            regular, bold, _tenant_logo(tenant))
+
+
+def write_pdf_fast(fp, tenant, result, generated=None, client=None, invariant=False, compress=True):
+    """Draw a one-page report directly on a canvas.
+
+    Returns False, having written nothing, when the report would overflow the
+    page or contains markup that needs the Platypus renderer.
+    """
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    if any("<" in a or "&" in a for a in result.actions):
+        return False
+    stamp = _stamp(generated)
+    title, footer, accent, body, black, regular, bold, logo = _template(tenant)
+    ops = []  # (x, baseline, font, size, colour, text)
+    y = TOP
+    if logo:
+        y -= logo[2] + 10
+    for line in title:
+        ops.append((LEFT, y - 18, regular, 18, accent, line))
+        y -= 22
+    y -= 12
+
+    def labelled(label, text):
+        nonlocal y
+        x = LEFT + stringWidth(label, bold, 11)
+        ops.append((LEFT, y - 11, bold, 11, body, label))
+        ops.append((x, y - 11, regular, 11, body, text))
+        y -= 16
+        return x + stringWidth(text, regular, 11) <= LEFT + WIDTH
+
+    if client and not labelled("Prepared for:", f" {client}"):
+        return False
+    if stamp:
+        ops.append((LEFT, y - 11, regular, 11, body, stamp))
+        y -= 16
+    y -= 8
+    labelled("Probate Risk:", f" {result.probate_label} (score {result.probate_risk})")
+    labelled("Dispute Risk:", f" {result.dispute_label} (score {result.dispute_risk})")
+    y -= 10
+    ops.append((LEFT, y - 13, regular, 13, accent, "Recommended Actions"))
+    y -= 16 + 6
+    if result.actions:
+        for n, action in enumerate(result.actions, start=1):
+            ops.append((LEFT, y - 12, regular, 12, black, str(n)))
+            for line in _lines(action, regular, 11, WIDTH - INDENT):
+                ops.append((LEFT + INDENT, y - 11, regular, 11, body, line))
+                y -= 16
+    else:
+        ops.append((LEFT, y - 11, regular, 11, body, "No immediate actions detected."))
+        y -= 16
+    if footer:
+        y -= 14
+        for line in footer:
+            ops.append((LEFT, y - 11, regular, 11, body, line))
+            y -= 16
+    if y < BOTTOM:
+        return False
+
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(fp, pagesize=(PAGE_W, PAGE_H), invariant=1 if invariant else None,
+                      pageCompression=1 if compress else 0)
+    if logo:
+        from reportlab.lib.utils import ImageReader
+        c.drawImage(ImageReader(io.BytesIO(logo[0])), LEFT, TOP - logo[2], logo[1], logo[2])
+    # One text object for the page: drawString would open and close a new one per line.
+    t = c.beginText()
+    font = colour = None
+    for x, baseline, name, size, fill, text in ops:
+        if (name, size) != font:
+            t.setFont(name, size)
+            font = (name, size)
+        if fill != colour:
+            t.setFillColor(fill)
+            colour = fill
+        t.setTextOrigin(x, baseline)
+        t.textOut(text)
+    c.drawText(t)
+    c.showPage()
+    c.save()
+    return True
+
+
+def write_pdf(fp, tenant, result, generated=None, client=None, fast=True, invariant=False, compress=True):
+    """Render one report into the binary file object ``fp`` (a file, ZIP entry or HTTP response)."""
+    _setup()
+    if fast and write_pdf_fast(fp, tenant, result, generated, client, invariant, compress):
+        return
+    _doc(fp, invariant, compress).build(story(tenant, result, generated, client))
+
+
+def build_pdf(tenant, result, generated=None, client=None, fast=True, invariant=False, compress=True):
+    """Render one report and return ReportLab's own output buffer, without copying it."""
+    sink = _Capture()
+    write_pdf(sink, tenant, result, generated, client, fast, invariant, compress)
+    return sink.getvalue()
+
+
+def report_key(tenant, result, client=None, generated=False):
+    """Cache key for a rendered report: what it shows (branding, scores, actions), not how it was answered.
+
+    ``generated`` must be the value the report is rendered with (a datetime,
+    a date, or False for no time), so cached bytes never carry another render's time.
+    """
+    if generated is None:
+        raise ValueError("report_key needs the generation time the report is rendered with, not None")
+    stamp = _stamp(generated) or "-"
+    shown = (tenant.pdf_title, tenant.pdf_color, tenant.pdf_footer, tenant.pdf_fonts, tenant.pdf_logo and tenant.logo_path,
+             client, stamp, result.probate_risk,
+             result.probate_label, result.dispute_risk, result.dispute_label, *result.actions)
+    return hashlib.sha256("\x1f".join(map(str, shown)).encode()).hexdigest()
+
+
+def etag(data):
+    """Strong HTTP entity tag for a rendered report (a hash of its bytes)."""
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def write_merged_pdf(fp, reports, generated=None):
+    """Render ``(client, tenant, result)`` triples into one PDF, each client starting a new page.
+
+    Flowables are produced lazily, one client at a time; ReportLab still keeps
+    the finished (compressed) page streams until the document is saved.
+    """
+    from reportlab.platypus import PageBreak
+
+    class Feed(list):
+        # doc.build() loops on len() and deletes flowables from the front of its
+        # list; refill it from the iterator so only one client's story exists
+        # at any moment.
+        def __init__(self):
+            super().__init__()
+            self.count = 0
+            self._pending = iter(reports)
+            self._styles = {}
+
+        def __len__(self):
+            if not list.__len__(self):
+                self._refill()
+            return list.__len__(self)
+
+        def _refill(self):
+            for client, tenant, result in self._pending:
+                styles = self._styles.get(tenant.slug)
+                if styles is None:
+                    styles = self._styles[tenant.slug] = _styles(tenant)
+                if self.count:
+                    self.append(PageBreak())
+                self.extend(story(tenant, result, generated, client, styles))
+                self.count += 1
+                return
+
+    feed = Feed()
+    if not len(feed):
+        from reportlab.platypus import Paragraph
+        from reportlab.lib.styles import getSampleStyleSheet
+        feed.append(Paragraph("No reports.", getSampleStyleSheet()["Normal"]))
+    _doc(fp).build(feed)
+    return feed.count
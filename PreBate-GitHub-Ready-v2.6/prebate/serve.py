@@ -0,0 +1,192 @@
+"""Cacheable report downloads and the offline questionnaire over plain HTTP.
+
+    python -m prebate.serve [--host 0.0.0.0] [--port 8502]
+
+``GET /report/<token>.pdf`` renders the report a result link (``?r=<token>``)
+stands for, in invariant mode and without a generation time unless
+``?generated=YYYY-MM-DDTHH:MM`` asks for one, so one URL is always the same
+bytes. Responses carry ``Cache-Control`` and an ``ETag`` taken from the report
+key; a matching ``If-None-Match`` gets ``304 Not Modified`` without rendering,
+and a CDN in front can serve repeats without reaching the app. Rendering goes through the shared
+render pool and report cache (``prebate.render``, ``prebate.cache``); when the
+pool is saturated the answer is ``503`` with ``Retry-After``.
+
+``/pwa/`` and ``/pwa/<slug>/`` serve the offline questionnaire (``prebate.pwa``),
+and ``POST /api/submit`` scores the answer sets it syncs: the body is
+``{"tenant", "version", "answers"}`` as in ``prebate.bulk``, the reply the
+labels, actions, result token and ``report`` path (plus ``app``, a link into
+the Streamlit app, when ``PREBATE_APP_URL`` is set).
+
+``app`` is a plain WSGI callable, so any WSGI server can host it instead of
+the stdlib one used by ``main``.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import TimeoutError as WaitTimeout
+from datetime import datetime
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIServer, make_server
+
+from prebate import bulk, cache, engine, pwa, render, report, tenants, tokens
+
+ROUTE = re.compile(r"/report/([A-Za-z0-9_-]+)\.pdf")
+PWA = re.compile(r"/pwa(?:/([a-z0-9][a-z0-9-]{0,62}))?/([a-z]+\.[a-z]+)?")
+APP_URL_ENV = "PREBATE_APP_URL"
+MAX_AGE = 86400
+MAX_BODY = 64 << 10
+WAIT = 30  # seconds a request waits for its render
+
+
+def _plain(start_response, status, text, headers=()):
+    body = text.encode()
+    start_response(status, [("Content-Type", "text/plain; charset=utf-8"),
+                            ("Content-Length", str(len(body))), *headers])
+    return [body]
+
+
+def _json(start_response, status, value):
+    body = json.dumps(value, ensure_ascii=False).encode()
+    start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(body))),
+                            ("Cache-Control", "no-store")])
+    return [body]
+
+
+def _matches(header, tag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return tag in (t.strip().removeprefix("W/") for t in header.split(","))
+
+
+def _render(key, tenant, result, generated):
+    return render.submit(key, cache.reports().get, key,
+                         lambda: report.build_pdf(tenant, result, generated, invariant=True))
+
+
+def app(environ, start_response):
+    method = environ["REQUEST_METHOD"]
+    path = environ.get("PATH_INFO", "")
+    if path == "/api/submit":
+        if method != "POST":
+            return _plain(start_response, "405 Method Not Allowed", "use POST", [("Allow", "POST")])
+        return _submit(environ, start_response)
+    if path.startswith("/pwa") and not path.endswith("/") and PWA.fullmatch(path + "/"):
+        start_response("301 Moved Permanently", [("Location", path + "/"), ("Content-Length", "0")])
+        return []
+    match = PWA.fullmatch(path) or ROUTE.fullmatch(path)
+    if not match:
+        return _plain(start_response, "404 Not Found", "not found")
+    if method not in ("GET", "HEAD"):
+        return _plain(start_response, "405 Method Not Allowed", "use GET", [("Allow", "GET, HEAD")])
+    if match.re is PWA:
+        return _pwa(environ, start_response, *match.groups())
+    try:
+        tenant, answers = tokens.read(match.group(1))
+    except tokens.TokenError as e:
+        return _plain(start_response, "404 Not Found", str(e))
+    query = parse_qs(environ.get("QUERY_STRING", ""))
+    generated = False
+    if "generated" in query:
+        try:
+            generated = datetime.fromisoformat(query["generated"][0])
+        except ValueError:
+            return _plain(start_response, "400 Bad Request", "generated must be an ISO date and time")
+
+    result = tenant.questionnaire.score(answers)
+    # Invariant bytes are a function of the key, so the key is the entity tag and a
+    # revalidation is answered without rendering (or even reaching the cache).
+    key = report.report_key(tenant, result, generated=generated)
+    tag = f'"{key[:32]}"'
+    headers = [("ETag", tag), ("Cache-Control", f"public, max-age={MAX_AGE}")]
+    if _matches(environ.get("HTTP_IF_NONE_MATCH"), tag):
+        start_response("304 Not Modified", headers)
+        return []
+    try:
+        data = _render(key, tenant, result, generated).result(timeout=WAIT)
+    except (render.Overloaded, TimeoutError, WaitTimeout):
+        return _plain(start_response, "503 Service Unavailable", "busy, try again shortly", [("Retry-After", "5")])
+    name = tenant.slug or "prebate"
+    start_response("200 OK", headers + [("Content-Type", "application/pdf"), ("Content-Length", str(len(data))),
+                                        ("Content-Disposition", f'inline; filename="{name}_report.pdf"')])
+    return [] if method == "HEAD" else [data]
+
+
+def _pwa(environ, start_response, slug, name):
+    try:
+        tenant = tenants.load(slug) if slug else tenants.default()
+    except (LookupError, tenants.TenantError, engine.DefinitionError):
+        return _plain(start_response, "404 Not Found", f"unknown tenant: {slug}")
+    hit = pwa.files(tenant).get(name or "index.html")
+    if hit is None:
+        return _plain(start_response, "404 Not Found", "not found")
+    kind, data = hit
+    tag = report.etag(data)
+    headers = [("ETag", tag), ("Cache-Control", "no-cache")]  # the service worker is the offline cache
+    if _matches(environ.get("HTTP_IF_NONE_MATCH"), tag):
+        start_response("304 Not Modified", headers)
+        return []
+    start_response("200 OK", headers + [("Content-Type", kind), ("Content-Length", str(len(data)))])
+    return [] if environ["REQUEST_METHOD"] == "HEAD" else [data]
+
+
+def _submit(environ, start_response):
+    try:
+        size = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        size = -1
+    if not 0 < size <= MAX_BODY:
+        return _json(start_response, "400 Bad Request", {"error": "expected a JSON body"})
+    try:
+        row = json.loads(environ["wsgi.input"].read(size))
+        if not isinstance(row, dict):
+            raise bulk.RecordError("expected a JSON object")
+        _, tenant, answers = bulk.to_record({k: row.get(k) for k in ("tenant", "version", "answers")})
+    except ValueError as e:  # bad JSON, or a RecordError
+        return _json(start_response, "400 Bad Request", {"error": str(e)})
+    result = tenant.questionnaire.score(answers)
+    token = tokens.issue(tenant, answers)
+    try:
+        _render(report.report_key(tenant, result), tenant, result, False)  # warm the cache for the PDF link
+    except render.Overloaded:
+        pass
+    reply = {
+        "token": token,
+        "probate": {"label": result.probate_label, "pill": result.probate_pill, "score": result.probate_risk},
+        "dispute": {"label": result.dispute_label, "pill": result.dispute_pill, "score": result.dispute_risk},
+        "actions": list(result.actions),
+        "report": f"/report/{token}.pdf",
+    }
+    app_url = os.environ.get(APP_URL_ENV)
+    if app_url:
+        sep = "&" if "?" in app_url else "?"
+        reply["app"] = f"{app_url}{sep}r={token}"
+    return _json(start_response, "200 OK", reply)
+
+
+class _Server(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve cacheable PDF reports and the offline questionnaire.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+    with make_server(args.host, args.port, app, server_class=_Server) as server:
+        print(f"serving reports on http://{args.host}:{args.port}/report/<token>.pdf "
+              f"and the offline questionnaire on http://{args.host}:{args.port}/pwa/", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
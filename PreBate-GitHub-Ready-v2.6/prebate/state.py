@@ -0,0 +1,118 @@
+"""Compact per-session answer state.
+
+``AnswerState`` keeps one small integer code per question (0 = unanswered,
+n = the question's n-th option) in a ``bytearray`` instead of a dict of long
+string keys and values. It behaves like the old ``answers`` dict, so scoring
+and navigation code can keep using ``answers.get(qid)``, and packs to two bits
+per question (8 bytes for 29 questions) for persistence and resume links.
+
+The state stays minimal: changing an answer blanks every answer that the
+change hides through ``show_if`` (recursively), so stale follow-up answers
+never reach scoring, tokens or storage.
+"""
+
+from collections.abc import MutableMapping
+
+BITS = 2
+PER_BYTE = 8 // BITS
+MASK = (1 << BITS) - 1
+
+
+def pack(codes):
+    out = bytearray((len(codes) + PER_BYTE - 1) // PER_BYTE)
+    for i, c in enumerate(codes):
+        out[i // PER_BYTE] |= c << (i % PER_BYTE * BITS)
+    return bytes(out)
+
+
+def unpack(data, n):
+    if len(data) != (n + PER_BYTE - 1) // PER_BYTE:
+        raise ValueError(f"expected {n} packed answers, got {len(data)} bytes")
+    return bytearray((data[i // PER_BYTE] >> (i % PER_BYTE * BITS)) & MASK for i in range(n))
+
+
+class AnswerState(MutableMapping):
+    __slots__ = ("qn", "codes")
+
+    def __init__(self, qn, answers=None):
+        self.qn = qn
+        self.codes = bytearray(len(qn.questions))
+        if answers:
+            self.update(answers)
+            qn.prune(self.codes)  # whatever order the answers came in
+
+    @classmethod
+    def from_codes(cls, qn, codes):
+        if len(codes) != len(qn.questions):
+            raise ValueError(f"expected {len(qn.questions)} answer codes, got {len(codes)}")
+        for q, c in zip(qn.questions, codes):
+            if c > len(q["opts"]):
+                raise ValueError(f"invalid answer code {c} for '{q['id']}'")
+        state = cls(qn)
+        state.codes[:] = codes
+        qn.prune(state.codes)
+        return state
+
+    @classmethod
+    def from_bytes(cls, qn, data):
+        return cls.from_codes(qn, unpack(data, len(qn.questions)))
+
+    def to_bytes(self):
+        return pack(self.codes)
+
+    def rebind(self, qn):
+        """Carry the answers over to another (e.g. reloaded) questionnaire, dropping any that no longer fit."""
+        state = type(self)(qn)
+        for qid, value in self.items():
+            i = qn.index.get(qid)
+            if i is not None:
+                state.codes[i] = qn.codes[i].get(value, 0)
+        qn.prune(state.codes)
+        return state
+
+    def copy(self):
+        return type(self).from_codes(self.qn, self.codes)
+
+    def __getitem__(self, qid):
+        i = self.qn.index[qid]
+        c = self.codes[i]
+        if not c:
+            raise KeyError(qid)
+        return self.qn.questions[i]["opts"][c - 1]
+
+    def get(self, qid, default=None):
+        i = self.qn.index.get(qid)
+        if i is None or not self.codes[i]:
+            return default
+        return self.qn.questions[i]["opts"][self.codes[i] - 1]
+
+    def __contains__(self, qid):
+        i = self.qn.index.get(qid)
+        return i is not None and self.codes[i] != 0
+
+    def answer(self, i, value):
+        """Answer question ``i`` (by index); returns the indexes of follow-up answers this cleared."""
+        code = self.qn.codes[i].get(value)
+        if code is None:
+            raise ValueError(f"{value!r} is not an option of '{self.qn.questions[i]['id']}'")
+        self.codes[i] = code
+        return self.qn.prune(self.codes, i)
+
+    def __setitem__(self, qid, value):
+        self.answer(self.qn.index[qid], value)
+
+    def __delitem__(self, qid):
+        i = self.qn.index[qid]
+        if not self.codes[i]:
+            raise KeyError(qid)
+        self.codes[i] = 0
+        self.qn.prune(self.codes, i)
+
+    def __iter__(self):
+        return (q["id"] for q, c in zip(self.qn.questions, self.codes) if c)
+
+    def __len__(self):
+        return len(self.codes) - self.codes.count(0)
+
+    def __repr__(self):
+        return f"AnswerState({dict(self)!r})"
@@ -0,0 +1,30 @@
+// Cache-first for the questionnaire shell, so repeat visits and offline use
+// load from the device. VERSION changes whenever any cached file does, which
+// installs a fresh cache and drops the old one.
+const VERSION = "__VERSION__";
+const SHELL = __SHELL__;
+const PREFIX = "prebate-pwa:" + self.registration.scope + ":";  // scopes share the origin's CacheStorage
+const CACHE = PREFIX + VERSION;
+
+self.addEventListener("install", function (event) {
+  event.waitUntil(caches.open(CACHE).then(function (cache) {
+    return cache.addAll(SHELL);
+  }).then(function () { return self.skipWaiting(); }));
+});
+
+self.addEventListener("activate", function (event) {
+  event.waitUntil(caches.keys().then(function (keys) {
+    return Promise.all(keys.filter(function (k) { return k.startsWith(PREFIX) && k !== CACHE; })
+      .map(function (k) { return caches.delete(k); }));
+  }).then(function () { return self.clients.claim(); }));
+});
+
+self.addEventListener("fetch", function (event) {
+  const request = event.request;
+  if (request.method !== "GET" || !request.url.startsWith(self.registration.scope)) return;  // answers and reports go to the server
+  event.respondWith(caches.open(CACHE).then(function (cache) {
+    return cache.match(request, {ignoreSearch: true}).then(function (hit) {
+      return hit || fetch(request);
+    });
+  }));
+});
@@ -0,0 +1,284 @@
+"""Stored assessments for advisers: find clients by label, action, score, date or notes.
+
+    PREBATE_STORE_DB=/var/lib/prebate/clients.db
+
+    python -m prebate.store clients.jsonl     # import bulk-export records (see prebate.bulk)
+
+Each assessment is scored once, when it is stored, and kept as plain
+columns: labels and scores with their own indexes, and one row per
+recommended action in ``flags`` (keyed by action, then date), so "everyone
+told to revoke informal access" is an index range rather than a rescore of
+every answer set. Notes are searched through an FTS5 index kept in step by
+triggers. Listing is keyset-paginated on ``(sort key, id)``: the next page
+starts where the last row left off, so page 1000 costs what page 1 does.
+
+The result token is stored instead of the answers, so a stored assessment
+reopens in the app like any result link.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from prebate import bulk, tokens
+
+DB_ENV = "PREBATE_STORE_DB"
+PAGE = 50
+ORDERS = {  # name -> (column, description); flags repeats these columns so it can be read in any order
+    "created": ("created", "Newest first"),
+    "probate": ("probate_risk", "Highest probate score"),
+    "dispute": ("dispute_risk", "Highest dispute score"),
+}
+
+_store = None
+_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    client TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    tenant TEXT NOT NULL DEFAULT '',
+    token TEXT NOT NULL,
+    probate_risk INTEGER NOT NULL,
+    probate_label TEXT NOT NULL,
+    dispute_risk INTEGER NOT NULL,
+    dispute_label TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT '');
+CREATE INDEX IF NOT EXISTS assessments_created ON assessments (created);
+CREATE INDEX IF NOT EXISTS assessments_probate_label ON assessments (probate_label, created);
+CREATE INDEX IF NOT EXISTS assessments_dispute_label ON assessments (dispute_label, created);
+CREATE INDEX IF NOT EXISTS assessments_probate_risk ON assessments (probate_risk);
+CREATE INDEX IF NOT EXISTS assessments_dispute_risk ON assessments (dispute_risk);
+
+CREATE TABLE IF NOT EXISTS actions (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS flags (
+    action INTEGER NOT NULL REFERENCES actions (id),
+    created REAL NOT NULL,
+    probate_risk INTEGER NOT NULL,
+    dispute_risk INTEGER NOT NULL,
+    assessment INTEGER NOT NULL REFERENCES assessments (id) ON DELETE CASCADE,
+    PRIMARY KEY (action, created, assessment)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS flags_probate_risk ON flags (action, probate_risk, assessment);
+CREATE INDEX IF NOT EXISTS flags_dispute_risk ON flags (action, dispute_risk, assessment);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5 (notes, content='assessments', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS notes_insert AFTER INSERT ON assessments WHEN new.notes != '' BEGIN
+    INSERT INTO notes_fts (rowid, notes) VALUES (new.id, new.notes);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_update AFTER UPDATE OF notes ON assessments BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, notes) SELECT 'delete', old.id, old.notes WHERE old.notes != '';
+    INSERT INTO notes_fts (rowid, notes) SELECT new.id, new.notes WHERE new.notes != '';
+END;
+CREATE TRIGGER IF NOT EXISTS notes_delete AFTER DELETE ON assessments WHEN old.notes != '' BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+END;
+"""
+
+
+class Assessment(NamedTuple):
+    id: int
+    created: float
+    client: str
+    email: str
+    tenant: str
+    token: str
+    probate_risk: int
+    probate_label: str
+    dispute_risk: int
+    dispute_label: str
+    notes: str
+
+
+class Filters(NamedTuple):
+    probate_label: str = ""
+    dispute_label: str = ""
+    action: str = ""  # the action's text
+    since: float = None  # created >= since
+    until: float = None  # created < until
+    notes: str = ""  # words to find in the notes
+
+
+def match_query(text):
+    """User text -> an FTS5 query matching every word (as a prefix), with no FTS syntax of its own."""
+    words = re.findall(r"\w+", text)
+    return " ".join('"' + w + '"*' for w in words)
+
+
+class Store:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._db() as db:
+            db.executescript(SCHEMA)
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+        return db
+
+    def add(self, records):
+        """Store ``(client, tenant, AnswerState, email, created)`` records in one transaction; returns how many.
+
+        ``created`` is a Unix time, or None for now.
+        """
+        count = 0
+        action_ids = {}
+        with self._db() as db:
+            for client, tenant, answers, email, created in records:
+                result = tenant.questionnaire.score(answers)
+                created = time.time() if created is None else created
+                cur = db.execute(
+                    "INSERT INTO assessments (created, client, email, tenant, token, probate_risk, probate_label, "
+                    "dispute_risk, dispute_label) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (created, client or "", email or "", tenant.slug, tokens.issue(tenant, answers),
+                     result.probate_risk, result.probate_label, result.dispute_risk, result.dispute_label))
+                flags = []
+                for act in result.actions:
+                    if act not in action_ids:
+                        db.execute("INSERT OR IGNORE INTO actions (text) VALUES (?)", (act,))
+                        action_ids[act] = db.execute("SELECT id FROM actions WHERE text = ?", (act,)).fetchone()[0]
+                    flags.append((action_ids[act], created, result.probate_risk, result.dispute_risk, cur.lastrowid))
+                db.executemany("INSERT OR IGNORE INTO flags VALUES (?, ?, ?, ?, ?)", flags)
+                count += 1
+        return count
+
+    def get(self, assessment_id):
+        row = self._db().execute("SELECT * FROM assessments WHERE id = ?", (assessment_id,)).fetchone()
+        return Assessment(*row) if row else None
+
+    def set_notes(self, assessment_id, notes):
+        with self._db() as db:
+            db.execute("UPDATE assessments SET notes = ? WHERE id = ?", (notes.strip(), assessment_id))
+
+    def actions(self):
+        """Every action text seen, alphabetically."""
+        return [text for text, in self._db().execute("SELECT text FROM actions ORDER BY text")]
+
+    def labels(self, kind):
+        """The probate (``kind="probate"``) or dispute labels in use."""
+        column = {"probate": "probate_label", "dispute": "dispute_label"}[kind]
+        return [label for label, in self._db().execute(f"SELECT DISTINCT {column} FROM assessments ORDER BY 1")]
+
+    def page(self, filters=None, order="created", after=None, limit=PAGE):
+        """One page of matching assessments, highest sort key first, and the cursor for the next page.
+
+        ``after`` is the cursor returned with the previous page (``None`` for
+        the first); the returned cursor is None on the last page.
+        """
+        filters = filters or Filters()
+        column = ORDERS[order][0]
+        where, args = [], []
+        source, key = "assessments a", (f"a.{column}", "a.id")
+        if filters.action:
+            # Drive the query from the action's flags, indexed in every sort order.
+            source, key = "flags f JOIN assessments a ON a.id = f.assessment", (f"f.{column}", "f.assessment")
+            where.append("f.action = (SELECT id FROM actions WHERE text = ?)")
+            args.append(filters.action)
+        created = "f.created" if filters.action else "a.created"
+        for name, column_name in (("probate_label", "a.probate_label"), ("dispute_label", "a.dispute_label")):
+            if getattr(filters, name):
+                where.append(f"{column_name} = ?")
+                args.append(getattr(filters, name))
+        if filters.since is not None:
+            where.append(f"{created} >= ?")
+            args.append(filters.since)
+        if filters.until is not None:
+            where.append(f"{created} < ?")
+            args.append(filters.until)
+        query = match_query(filters.notes)
+        if query:
+            where.append("a.id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)")
+            args.append(query)
+        if after is not None:
+            where.append(f"({key[0]}, {key[1]}) < (?, ?)")
+            args.extend(after)
+        sql = (f"SELECT a.* FROM {source}" + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY {key[0]} DESC, {key[1]} DESC LIMIT ?")
+        rows = [Assessment(*row) for row in self._db().execute(sql, args + [limit + 1])]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, ({"created": last.created, "probate": last.probate_risk,
+                       "dispute": last.dispute_risk}[order], last.id)
+
+
+def enabled():
+    return bool(os.environ.get(DB_ENV))
+
+
+def store():
+    """The process-wide store named by ``PREBATE_STORE_DB``."""
+    global _store
+    with _lock:
+        if _store is None:
+            if not enabled():
+                raise LookupError(f"the client store is off: set {DB_ENV}")
+            _store = Store(os.environ[DB_ENV])
+        return _store
+
+
+def _created(row):
+    value = str(row.get("date") or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise bulk.RecordError(f"date must be an ISO date, got {value!r}") from None
+
+
+def rows_to_records(rows, errors):
+    """Bulk export rows (see ``prebate.bulk``, plus optional ``email`` and ``date``) -> records for ``Store.add``."""
+    for line, row in rows:
+        try:
+            if isinstance(row, bulk.RecordError):
+                raise row
+            client, tenant, answers = bulk.to_record(row)
+            created = _created(row)
+        except bulk.RecordError as e:
+            errors(line, str(e))
+            continue
+        yield client or f"Client {line}", tenant, answers, str(row.get("email") or "").strip(), created
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import assessments into the adviser client store.")
+    parser.add_argument("records", help="JSONL or CSV file of answer records ('-' for stdin)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from the file name)")
+    parser.add_argument("--db", help=f"store file (default: {DB_ENV})")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.records.lower().endswith(".csv") else "jsonl")
+    failed = 0
+
+    def errors(line, message):
+        nonlocal failed
+        failed += 1
+        print(f"{args.records}:{line}: skipped: {message}", file=sys.stderr)
+
+    try:
+        target = Store(args.db) if args.db else store()
+    except LookupError as e:
+        print(e, file=sys.stderr)
+        return 2
+    src = sys.stdin if args.records == "-" else open(args.records, newline="", encoding="utf-8")
+    with src:
+        count = target.add(rows_to_records(bulk.read_rows(src, fmt), errors))
+    print(f"{count} assessment(s) stored, {failed} record(s) skipped", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
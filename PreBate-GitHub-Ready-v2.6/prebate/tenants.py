@@ -0,0 +1,215 @@
+"""White-label tenants served from one process.
+
+A tenant is ``tenants/<slug>.json``: it picks a questionnaire version, may
+override rule weights, and sets the logo, page text and PDF branding. Each
+tenant is built once and the same read-only object is shared by all of its
+sessions; it is rebuilt only when its file or questionnaire changes on disk.
+"""
+
+import base64
+import html
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from prebate import engine, report
+
+log = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent.parent
+TENANT_DIR = APP_DIR / "tenants"
+SLUG = re.compile(r"[a-z0-9][a-z0-9-]{0,62}")
+HEADER = "X-PreBate-Tenant"  # set by a reverse proxy that routes /<slug>/ subpaths here
+
+LOGO_CANDIDATES = [
+    APP_DIR / "assets" / "prebate_logo.png",
+    Path.cwd() / "assets" / "prebate_logo.png",
+    APP_DIR.parent / "assets" / "prebate_logo.png",
+    Path("/mount/src/prebate-pilot/assets/prebate_logo.png"),
+]
+
+
+class TenantError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Tenant:
+    slug: str
+    name: str
+    questionnaire: engine.Questionnaire
+    page_title: str = "PreBate – Estate Readiness"
+    hero_title: str = "PreBate – Estate Readiness"
+    hero_subtitle: str = "Helping you prepare your estate with easy-to-use guidance."
+    logo_html: str = ""
+    pdf_title: str = "PreBate – Estate Readiness Report"
+    pdf_color: str = "#10243D"
+    pdf_footer: str = ""
+    pdf_fonts: str = "standard"  # a key of report.FONTS
+    pdf_logo: bool = False  # put the logo at the top of the PDF
+    logo_path: str = ""
+
+
+def first_existing(paths):
+    for p in paths:
+        try:
+            if p.exists():
+                return p
+        except Exception:
+            continue
+    return None
+
+
+def logo_html_base64(path, alt="PreBate"):
+    try:
+        b64 = base64.b64encode(path.read_bytes()).decode("ascii")
+        return f"""
+        <div class="logo-wrap">
+          <img class="logo" alt="{html.escape(alt)}" src="data:image/png;base64,{b64}" />
+        </div>
+        """
+    except Exception:
+        return f"""
+        <div class="logo-fallback">
+          <div class="brand">{html.escape(alt)}</div>
+          <div class="tag">Estate Readiness</div>
+        </div>
+        """
+
+
+_tenants = {}  # slug -> (file stamp, questionnaire version, base questionnaire, Tenant)
+_defaults = {}  # questionnaire version -> Tenant
+_versions = {}  # (slug, questionnaire version) -> (Tenant, base questionnaire, Tenant on that version)
+_lock = threading.Lock()
+
+
+def default(version=engine.DEFAULT_VERSION):
+    qn = engine.load(version)
+    tenant = _defaults.get(version)
+    if tenant is None or tenant.questionnaire is not qn:
+        path = first_existing(LOGO_CANDIDATES)
+        tenant = _defaults[version] = Tenant(slug="", name="PreBate", questionnaire=qn,
+                                             logo_html=logo_html_base64(path or Path()),
+                                             logo_path=str(path) if path else "")
+    return tenant
+
+
+def slugs():
+    return sorted(p.stem for p in TENANT_DIR.glob("*.json") if SLUG.fullmatch(p.stem))
+
+
+def load(slug):
+    path = TENANT_DIR / f"{slug}.json"
+    if not SLUG.fullmatch(slug or "") or not path.is_file():
+        raise LookupError(f"unknown tenant: {slug!r}")
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    entry = _tenants.get(slug)
+    if entry is not None and entry[0] == stamp and entry[2] is engine.load(entry[1]):
+        return entry[3]
+    with _lock:
+        try:
+            try:
+                raw = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError as e:
+                raise TenantError(f"tenants/{slug}.json: {e}") from None
+            entry = (stamp, *_build(slug, raw))
+        except TenantError as e:
+            if entry is None:
+                raise
+            log.warning("%s; still serving the previously loaded tenant", e)
+            entry = (stamp, *entry[1:])
+        _tenants[slug] = entry
+        return entry[3]
+
+
+def at_version(tenant, version):
+    """``tenant`` (branding and weights) on questionnaire ``version``, for links issued before it moved on.
+
+    Raises LookupError for an unknown version and TenantError when the
+    tenant's weights don't fit it.
+    """
+    if tenant.questionnaire.version == version:
+        return tenant
+    base = engine.load(version)
+    entry = _versions.get((tenant.slug, version))
+    if entry is not None and entry[0] is tenant and entry[1] is base:
+        return entry[2]
+    try:
+        qn = base.with_weights(tenant.questionnaire.weights)
+    except engine.DefinitionError as e:
+        raise TenantError(f"tenant {tenant.slug!r} on questionnaire {version}: {e}") from None
+    older = replace(tenant, questionnaire=qn)
+    _versions[(tenant.slug, version)] = (tenant, base, older)
+    return older
+
+
+def resolve(query_params, headers=None):
+    """Pick the tenant for a request: ``?tenant=<slug>``, else the proxy header, else the default."""
+    slug = query_params.get("tenant") or (headers or {}).get(HEADER)
+    if slug:
+        try:
+            return load(slug)
+        except LookupError:
+            pass
+        except (TenantError, engine.DefinitionError) as e:  # its file (or its questionnaire's) is broken
+            log.error("%s", e)
+    try:
+        return default(query_params.get("v", engine.DEFAULT_VERSION))
+    except LookupError:
+        return default()
+    except engine.DefinitionError as e:  # a broken version file: serve the default version instead
+        log.error("%s", e)
+        return default()
+
+
+def _build(slug, raw):
+    def fail(msg):
+        raise TenantError(f"tenants/{slug}.json: {msg}")
+
+    if not isinstance(raw, dict) or not isinstance(raw.get("name"), str) or not raw["name"]:
+        fail("needs a 'name'")
+    unknown = set(raw) - {"name", "questionnaire", "weights", "logo", "page_title", "hero_title",
+                          "hero_subtitle", "pdf"}
+    if unknown:
+        fail(f"unknown keys {sorted(unknown)}")
+    version = raw.get("questionnaire", engine.DEFAULT_VERSION)
+    if not isinstance(version, str):
+        fail("'questionnaire' must be a version string")
+    try:
+        base = engine.load(version)
+    except (LookupError, engine.DefinitionError) as e:
+        fail(str(e))
+    weights = raw.get("weights") or {}
+    if not isinstance(weights, dict):
+        fail("'weights' must be an object of rule ids")
+    try:
+        qn = base.with_weights(weights)
+    except engine.DefinitionError as e:
+        fail(str(e))
+
+    logo = raw.get("logo")
+    if logo is not None and not isinstance(logo, str):
+        fail("'logo' must be a file name")
+    logo_path = (TENANT_DIR / logo) if logo else first_existing(LOGO_CANDIDATES) or Path()
+    pdf = raw.get("pdf") or {}
+    if not isinstance(pdf, dict) or set(pdf) - {"title", "color", "footer", "fonts", "logo"}:
+        fail("'pdf' may only set 'title', 'color', 'footer', 'fonts' and 'logo'")
+    pdf = dict(pdf)
+    pdf_logo = pdf.pop("logo", False)
+    if not isinstance(pdf_logo, bool):
+        fail("'pdf.logo' must be true or false")
+    if pdf.get("fonts", "standard") not in report.FONTS:
+        fail(f"'pdf.fonts' must be one of {sorted(report.FONTS)}")
+    text = {k: raw[k] for k in ("page_title", "hero_title", "hero_subtitle") if k in raw}
+    text.update({f"pdf_{k}": v for k, v in pdf.items()})
+    if not all(isinstance(v, str) for v in text.values()):
+        fail("branding values must be strings")
+    if "pdf_color" in text and not re.fullmatch(r"#[0-9A-Fa-f]{6}", text["pdf_color"]):
+        fail("'pdf.color' must be a #RRGGBB colour")
+    return version, base, Tenant(slug=slug, name=raw["name"], questionnaire=qn,
+                                 logo_html=logo_html_base64(logo_path, raw["name"]),
+                                 pdf_logo=pdf_logo, logo_path=str(logo_path) if logo_path.is_file() else "", **text)
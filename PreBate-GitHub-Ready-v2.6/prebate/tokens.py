@@ -0,0 +1,138 @@
+"""Signed, URL-safe result tokens.
+
+A token carries everything needed to rebuild a report on any replica: the
+tenant, the questionnaire version and the full answer vector. Answers are
+packed as one mixed-radix integer (a few bits per question) written as a
+varint, and the payload is signed with a truncated HMAC-SHA256, so nothing
+about the respondent has to be stored server-side.
+
+Every replica must share the same ``PREBATE_TOKEN_SECRET``.
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+
+from prebate import engine, tenants
+from prebate.state import AnswerState
+
+log = logging.getLogger(__name__)
+
+FORMAT = 1
+MAC_BYTES = 12
+SCHEMA_BYTES = 4
+SECRET_ENV = "PREBATE_TOKEN_SECRET"
+
+_fallback_secret = None
+
+
+class TokenError(ValueError):
+    pass
+
+
+def secret():
+    global _fallback_secret
+    key = os.environ.get(SECRET_ENV)
+    if key:
+        return key.encode()
+    if _fallback_secret is None:
+        log.warning("%s is not set; result links will only work on this process", SECRET_ENV)
+        _fallback_secret = secrets.token_bytes(32)
+    return _fallback_secret
+
+
+def schema_digest(qn):
+    """Fingerprint of the answer layout (question ids and options), not of texts or weights."""
+    layout = "\n".join(f"{q['id']}={'|'.join(q['opts'])}" for q in qn.questions)
+    return hashlib.sha256(layout.encode()).digest()[:SCHEMA_BYTES]
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        if pos >= len(data) or shift > 448:
+            raise TokenError("truncated token")
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return n, pos
+
+
+def _read_str(data, pos):
+    size, pos = _read_varint(data, pos)
+    if pos + size > len(data):
+        raise TokenError("truncated token")
+    try:
+        return data[pos:pos + size].decode("ascii"), pos + size
+    except UnicodeDecodeError:
+        raise TokenError("malformed token") from None
+
+
+def _sign(payload, key):
+    return hmac.new(key, payload, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def issue(tenant, answers, key=None):
+    qn = tenant.questionnaire
+    codes = qn.encode(answers)
+    packed = 0
+    for q, c in zip(reversed(qn.questions), reversed(codes)):
+        packed = packed * (len(q["opts"]) + 1) + c
+    slug, version = tenant.slug.encode("ascii"), qn.version.encode("ascii")
+    payload = (bytes([FORMAT]) + _varint(len(slug)) + slug + _varint(len(version)) + version
+               + schema_digest(qn) + _varint(packed))
+    token = payload + _sign(payload, key or secret())
+    return base64.urlsafe_b64encode(token).rstrip(b"=").decode("ascii")
+
+
+def read(token, key=None):
+    """Verify a token and return ``(tenant, AnswerState)``; raises TokenError if it can't be trusted."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        raise TokenError("malformed token") from None
+    payload, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if len(payload) < 1 or not hmac.compare_digest(mac, _sign(payload, key or secret())):
+        raise TokenError("token signature does not match")
+    if payload[0] != FORMAT:
+        raise TokenError(f"unsupported token format {payload[0]}")
+    slug, pos = _read_str(payload, 1)
+    version, pos = _read_str(payload, pos)
+    schema, pos = payload[pos:pos + SCHEMA_BYTES], pos + SCHEMA_BYTES
+    packed, pos = _read_varint(payload, pos)
+    if pos != len(payload):
+        raise TokenError("malformed token")
+
+    try:
+        # A tenant may have moved to a newer questionnaire since the link was issued;
+        # score it on the version it was answered on.
+        tenant = tenants.at_version(tenants.load(slug), version) if slug else tenants.default(version)
+    except (LookupError, tenants.TenantError, engine.DefinitionError) as e:
+        raise TokenError(str(e)) from None
+    qn = tenant.questionnaire
+    if schema != schema_digest(qn):
+        raise TokenError(f"token was issued for a different revision of questionnaire {version}")
+    codes = bytearray()
+    for q in qn.questions:
+        packed, c = divmod(packed, len(q["opts"]) + 1)
+        codes.append(c)
+    if packed:
+        raise TokenError("malformed token")
+    return tenant, AnswerState.from_codes(qn, codes)